@@ -2,17 +2,26 @@
 
 import argparse
 import concurrent.futures
+import errno
+import functools
 import gettext
 import hashlib
+import io
+import itertools
 import json
 import locale
+import mmap
 import os
+import queue
+import re
 import shutil
+import sqlite3
 import threading
 import time
 import tkinter as tk
 import zipfile
 from tkinter import filedialog, ttk, messagebox, simpledialog
+from types import MappingProxyType
 
 import logger
 from jinja2 import Environment, FileSystemLoader
@@ -21,26 +30,38 @@ from logging.handlers import RotatingFileHandler
 import asyncio
 import aiohttp
 import requests  # Keep for initial synchronous check
+from requests.adapters import HTTPAdapter
 from multiprocessing import Pool, cpu_count  # Import cpu_count
 import traceback  # For detailed error logging
 
 # --- Library Imports for File Types ---
+try:
+	import fitz  # PyMuPDF: C-backed PDF text extraction, much faster than PyPDF2
+except ImportError:
+	fitz = None
+try:
+	from pdfminer.high_level import extract_text_to_fp as pdfminer_extract_text_to_fp
+except ImportError:
+	pdfminer_extract_text_to_fp = None
 try:
 	import PyPDF2
 except ImportError:
 	PyPDF2 = None
 try:
 	import docx
+	from docx.oxml.ns import qn as docx_qn
+	from docx.text.paragraph import Paragraph as DocxParagraph
 except ImportError:
-	docx = None
+	docx, docx_qn, DocxParagraph = None, None, None
 try:
 	import openpyxl
 except ImportError:
 	openpyxl = None
 try:
 	from odf import text as odf_text, teletype as odf_teletype
+	from odf.opendocument import load as odf_load
 except ImportError:
-	odf_text, odf_teletype = None, None
+	odf_text, odf_teletype, odf_load = None, None, None
 try:
 	from dropbox import Dropbox
 	from dropbox.exceptions import ApiError, AuthError
@@ -67,6 +88,24 @@ try:
 	import msal
 except ImportError:
 	msal = None
+try:
+	# Optional semantic cache: near-identical files reuse an earlier category without an LLM call
+	from sentence_transformers import SentenceTransformer
+	import faiss
+except ImportError:
+	SentenceTransformer, faiss = None, None
+try:
+	import orjson  # Faster JSON encoding/decoding for the per-file Ollama requests
+except ImportError:
+	orjson = None
+try:
+	import blake3  # SIMD + multi-threaded cryptographic hash for deduplication
+except ImportError:
+	blake3 = None
+try:
+	import xxhash  # SIMD-accelerated non-cryptographic hash, much faster than MD5
+except ImportError:
+	xxhash = None
 
 # --- Basic Setup ---
 try:
@@ -91,34 +130,206 @@ logger.addHandler(log_handler)
 # logger.setLevel(logging.DEBUG) # Set DEBUG for more verbose output
 
 # --- Helper for Deduplication (Top Level for Multiprocessing) ---
-def process_file_for_deduplication(file_path):
-	"""Обрабатывает файл для получения информации о нём в multiprocessing."""
-	try:
-		hasher = hashlib.md5()
+HASH_CHUNK_SIZE = 1 << 20  # Head and tail hashed by the sampled cache key of large files (get_file_hash)
+MMAP_MIN_SIZE = 64 * 1024  # Below this a plain read is cheaper than setting up a mapping
+MMAP_LARGE_SIZE = 16 << 20  # From here the mapping beats file_digest's copy through its read buffer
+
+
+def hash_file(file_path):
+	"""Возвращает хеш всего файла (xxh3_64, либо MD5 без xxhash).
+
+	hashlib.file_digest below 16 MiB on Python 3.11+, an mmap of the whole file above that (or from 64 KiB
+	on older versions), and a single read into one buffer for small files.
+	"""
+	digest = xxhash.xxh3_64 if xxhash else hashlib.md5  # Only used as a content key, not for security
+	with open(file_path, 'rb', buffering=0) as f:  # Unbuffered: each read goes straight into the hasher
+		size = os.fstat(f.fileno()).st_size
+		if hasattr(hashlib, "file_digest") and size < MMAP_LARGE_SIZE:  # Python 3.11+, C-level read loop
+			return hashlib.file_digest(f, digest).hexdigest()
+		hasher = digest()
+		if size >= MMAP_MIN_SIZE:
+			# Hash straight from the page cache, no bytes object per chunk
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				hasher.update(mm)
+			return hasher.hexdigest()
+		# Small file: read into one reusable buffer (+1 so a file that grew is still read to the end)
+		buf = bytearray(size + 1)
+		view = memoryview(buf)
+		while n := f.readinto(buf):
+			hasher.update(view[:n])
+		return hasher.hexdigest()
+
+
+def dedup_hash_file(file_path, size):
+	"""Хеш для поиска дубликатов: BLAKE3 (если установлен), иначе hash_file.
+
+	Deduplication deletes files, so a 256-bit hash is preferred over the 64-bit cache key.
+	"""
+	if blake3 is None:
+		return hash_file(file_path)
+	if size < MMAP_MIN_SIZE:
 		with open(file_path, 'rb') as f:
-			# Read in chunks for potentially large files
-			while chunk := f.read(8192):
-				hasher.update(chunk)
+			return blake3.blake3(f.read()).hexdigest()
+	# Memory-mapped and SIMD-hashed; single-threaded, since deduplication already runs one worker per core
+	hasher = blake3.blake3()
+	hasher.update_mmap(file_path)
+	return hasher.hexdigest()
+
+
+def process_file_for_deduplication(file_entry):
+	"""Обрабатывает файл для получения информации о нём в multiprocessing.
+
+	file_entry — кортеж (путь, размер, время изменения), взятый из stat при сканировании.
+	"""
+	file_path, size, mod_time = file_entry
+	try:
 		return (file_path, {
-			"hash": hasher.hexdigest(),
-			"size": os.path.getsize(file_path),
-			"mod_time": os.path.getmtime(file_path),
-			"name": os.path.basename(file_path)
+			"hash": dedup_hash_file(file_path, size),
+			"size": size,
+			"mod_time": mod_time
 		})
 	except Exception as e:
 		logger.error(f"Error processing {file_path} for deduplication: {e}")
 		return (file_path, None)  # Return None on error
 
 
+def read_content_sample(file_path, extension, max_bytes, max_chars):
+	"""Читает короткий текстовый фрагмент файла для классификации.
+
+	Top level so document parsing can run in a process pool, off the GIL of the sorting process.
+	"""
+	content_sample = ""
+	try:
+		ext = extension.lower()
+		if ext == '.pdf' and (fitz or pdfminer_extract_text_to_fp or PyPDF2):
+			text = None
+			if fitz:
+				try:
+					with fitz.open(file_path) as doc:
+						text = ""
+						for page in doc.pages(0, min(doc.page_count, 2)):  # Sample first 2 pages
+							text += page.get_text() + "\n"
+							if len(text) >= max_chars: break
+				except Exception as fitz_err:
+					logger.debug(f"PyMuPDF failed for {os.path.basename(file_path)}: {fitz_err}")
+					text = None  # Malformed for MuPDF, let the other extractors try
+			if text is None and pdfminer_extract_text_to_fp:
+				try:
+					with open(file_path, 'rb') as f, io.StringIO() as out:
+						# laparams=None skips layout analysis, the slow part on scanned/complex pages
+						pdfminer_extract_text_to_fp(f, out, maxpages=2, laparams=None)
+						text = out.getvalue()
+				except Exception as pdfminer_err:
+					logger.debug(f"pdfminer failed for {os.path.basename(file_path)}: {pdfminer_err}")
+					text = None
+			if text is None and PyPDF2:
+				try:
+					with open(file_path, 'rb') as f:
+						reader = PyPDF2.PdfReader(f)
+						num_pages = len(reader.pages)
+						text = ""
+						for i in range(min(num_pages, 2)):  # Sample first 2 pages
+							page = reader.pages[i]
+							page_text = page.extract_text()
+							if page_text:
+								text += page_text + "\n"
+								if len(text) >= max_chars: break
+				except Exception as pdf_err:
+					logger.debug(f"PyPDF2 failed for {os.path.basename(file_path)}: {pdf_err}")
+					text = None
+			if text is None:
+				# Fallback to binary read
+				with open(file_path, 'rb') as f:
+					text = f.read(max_bytes).decode('utf-8', errors='ignore')
+			content_sample = text[:max_chars]
+
+		elif ext == '.docx' and docx:
+			try:
+				doc = docx.Document(file_path)
+				parts = []
+				total = 0
+				# Walk body paragraphs lazily (doc.paragraphs wraps every paragraph of the document)
+				for p_element in doc.element.body.iterchildren(docx_qn('w:p')):
+					para_text = DocxParagraph(p_element, doc).text
+					if not para_text: continue
+					parts.append(para_text)
+					total += len(para_text) + 1
+					if total >= max_chars: break  # Enough text for the sample
+				content_sample = "\n".join(parts)[:max_chars]
+			except Exception as docx_err:
+				logger.debug(f"python-docx failed for {os.path.basename(file_path)}: {docx_err}")
+				with open(file_path, 'rb') as f:
+					content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
+
+		elif ext == '.xlsx' and openpyxl:
+			try:
+				wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)  # Read only faster
+				sheet = wb.active
+				text = ""
+				cell_count = 0
+				for row in sheet.iter_rows(max_row=20, max_col=10):  # Sample 20x10 cells
+					for cell in row:
+						if cell.value is not None:
+							text += str(cell.value) + " "
+							cell_count += 1
+							if len(text) >= max_chars or cell_count > 50: break  # Limit cells too
+					if len(text) >= max_chars or cell_count > 50: break
+				content_sample = text[:max_chars]
+				wb.close()  # Close workbook
+			except Exception as xlsx_err:
+				logger.debug(f"openpyxl failed for {os.path.basename(file_path)}: {xlsx_err}")
+				with open(file_path, 'rb') as f:
+					content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
+
+		elif ext == '.odt' and odf_teletype:
+			try:
+				doc = odf_load(file_path)
+				parts = []
+				total = 0
+				# Top-level blocks (paragraphs, headings, lists) one by one, stop once the sample is full
+				for element in doc.text.childNodes:
+					block_text = odf_teletype.extractText(element)
+					if not block_text: continue
+					parts.append(block_text)
+					total += len(block_text) + 1
+					if total >= max_chars: break
+				content_sample = "\n".join(parts)[:max_chars]
+			except Exception as odt_err:
+				logger.debug(f"odfpy failed for {os.path.basename(file_path)}: {odt_err}")
+				with open(file_path, 'rb') as f:
+					content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
+
+		elif ext in ('.csv', '.tsv'):
+			# Raw text is already delimiter-separated; the header and first rows are the useful part
+			with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+				content_sample = "\n".join(f.read(8192).split('\n', 10)[:10])[:max_chars]
+
+		else:  # General text or binary fallback
+			with open(file_path, 'rb') as f:
+				content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
+
+	except Exception as e:
+		logger.warning(f"Error reading sample from {os.path.basename(file_path)}: {e}")
+		return ""  # Return empty on error
+
+	return content_sample.strip()
+
+
 # --- Localization ---
+@functools.lru_cache(maxsize=8)
+def _load_translation(loc):
+	"""Загружает каталог перевода один раз на локаль (.mo не перечитывается при каждом переключении)."""
+	return gettext.translation('sorter', localedir='locale', languages=[loc], fallback=True)
+
+
 def setup_localization(lang="en"):
 	"""Настраивает локализацию приложения."""
 	# Simplified setup assuming standard locale directory structure
 	languages = {'en': 'en_US', 'ru': 'ru_RU'}
 	loc = languages.get(lang, 'en_US')
 	try:
-		translation = gettext.translation('sorter', localedir='locale', languages=[loc], fallback=True)
-		translation.install()
+		translation = _load_translation(loc)
+		translation.install()  # Cheap; rebinds builtins._ to the cached catalog
 		return translation.gettext
 	except FileNotFoundError:
 		logger.warning(f"Locale directory 'locale' or translation files not found. Falling back to English.")
@@ -128,6 +339,62 @@ def setup_localization(lang="en"):
 _ = setup_localization("en")  # Default to English
 
 
+# --- JSON Helpers ---
+# orjson when installed; its decode errors subclass json.JSONDecodeError, so callers catch either
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def json_dumps_bytes(obj):
+	"""Serializes obj to a UTF-8 JSON request body."""
+	return orjson.dumps(obj) if orjson else json.dumps(obj).encode("utf-8")
+
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+# --- Extension Categories ---
+# Broad category per (lowercase, dotted) extension; read-only, shared by every sorter instance
+EXT_CATEGORY = MappingProxyType({
+	".jpg": "Images", ".jpeg": "Images", ".png": "Images", ".gif": "Images", ".bmp": "Images",
+	".webp": "Images", ".heic": "Images", ".heif": "Images", ".avif": "Images", ".tif": "Images", ".tiff": "Images",
+	".pdf": "Documents", ".doc": "Documents", ".docx": "Documents", ".odt": "Documents", ".txt": "Documents",
+	".xls": "Spreadsheets", ".xlsx": "Spreadsheets", ".csv": "Spreadsheets",
+	".mp3": "Music", ".wav": "Music", ".flac": "Music", ".ogg": "Music", ".opus": "Music", ".m4a": "Music",
+	".aac": "Music", ".wma": "Music", ".aiff": "Music",
+	".mp4": "Videos", ".avi": "Videos", ".mkv": "Videos", ".mov": "Videos", ".webm": "Videos", ".wmv": "Videos",
+	".m4v": "Videos", ".mpg": "Videos", ".mpeg": "Videos", ".flv": "Videos",
+	".zip": "Archives", ".rar": "Archives", ".7z": "Archives",
+})
+# Extensions whose category is certain; these skip sampling, hashing and the LLM when the category
+# exists. Documents and spreadsheets still go to the model, which can pick a finer subcategory.
+DETERMINISTIC_EXTENSIONS = frozenset(
+	ext for ext, category in EXT_CATEGORY.items() if category in ("Images", "Music", "Videos", "Archives"))
+# Formats whose sample needs a CPU-heavy parser; sampled in a process pool while sorting
+PARSED_SAMPLE_EXTENSIONS = frozenset({".pdf", ".docx", ".xlsx", ".odt"})
+# Seconds a classification cache entry is kept after it was last written or used
+CACHE_MAX_AGE = 180 * 24 * 3600
+# Formats that are already compressed; deflating them again in a backup costs CPU for no gain
+PRECOMPRESSED_EXTENSIONS = frozenset({
+	".jpg", ".jpeg", ".png", ".gif", ".mp3", ".mp4", ".zip", ".rar", ".7z", ".docx", ".xlsx", ".odt"})
+
+
+def extension_shortcuts(category_list):
+	"""Возвращает ".ext" -> путь категории для расширений, категория которых однозначна в этом наборе.
+
+	A deterministic extension only skips the model when its category exists and has no subcategories:
+	next to "Images/Photos" and "Images/Screenshots", plain "Images" would starve them of every image.
+	"""
+	lookup = {c.lower(): c for c in category_list}
+	parents = set()  # Every category that has a child ("a" and "a/b" for "a/b/c")
+	for category in lookup:
+		parts = category.split("/")
+		parents.update("/".join(parts[:i]) for i in range(1, len(parts)))
+	return {
+		ext: lookup[category.lower()]
+		for ext, category in EXT_CATEGORY.items()
+		if ext in DETERMINISTIC_EXTENSIONS and category.lower() in lookup and category.lower() not in parents}
+
+
 # --- Main Application Class ---
 class DocumentSorter:
 	# (Keep __init__ mostly the same, just add error checks for libraries)
@@ -139,12 +406,55 @@ class DocumentSorter:
 		self.root.geometry("768x1024")
 		self.root.resizable(True, True)
 
-		self.ollama_url = ollama_url
+		self.ollama_url = ollama_url  # One or more comma-separated base URLs
+		self._update_ollama_urls()
 		logger.info(f"DEBUG: self.ollama_url immediately after assignment in __init__: {self.ollama_url}")
+		# Pooled keep-alive connections to Ollama instead of a new TCP connection per request
+		self.session = requests.Session()
+		self.session.headers["Connection"] = "keep-alive"
+		# One pool per Ollama host; room for status checks overlapping with model fetches
+		adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+		self._aio_session = None  # Shared aiohttp session, created lazily on the asyncio loop
+		self._status_backoff = 1  # Seconds until the next status retry while Ollama is unreachable
+		self._status_after_id = None  # Pending status retry scheduled with root.after
+		self._drain_after_id = None  # Next scheduled _drain_ui run
 		self.model = "qwen2.5:7b"  # Default model
 		self.available_models = []
 		self.category_list = []
-		self.cache = self.load_cache()
+		self._category_lookup = {}  # Lowercase category path -> category path, built once per sort run
+		self._category_lookup_key = None  # tuple(category_list) the lookup tables were built for
+		self._category_set = frozenset()  # Category paths, for membership checks on answers and cache hits
+		self._extension_categories = {}  # ".ext" -> category path for the extension shortcut
+		self._unambiguous_categories = frozenset()  # Lowercase categories that are no other category's prefix
+		self._category_regex = None  # Compiled matcher finding any category name in a model answer
+		self._cached_system = None  # (single, batch) classification system prompts for the current categories
+		self._file_stats = {}  # File path -> os.stat_result captured during the directory scan
+		self._extract_executor = None  # Thread pool hashing and sampling files while sorting (None = loop default)
+		self._parse_executor = None  # Process pool parsing document samples while sorting (None = use threads)
+		self._move_executor = None  # Thread pool running file moves while sorting
+		self._same_fs = False  # Source and destination on the same filesystem (moves are plain renames)
+		self._dest_lock = threading.Lock()  # Guards destination name reservation across workers
+		self._reserved_dest_paths = set()  # Destination paths claimed by pending moves
+		self._log_queue = queue.Queue()  # Log lines waiting for the next UI drain
+		self._ui_calls = queue.Queue()  # (func, args) queued by worker threads, run on the Tk thread
+		self._progress_pending = None  # Latest progress value requested by any thread
+		self._progress_shown = None  # Progress value last applied to the progress bar
+		self._files_done = 0  # Files finished in the current sort run (guarded by _files_done_lock)
+		self._files_total = 0
+		self._files_done_lock = threading.Lock()
+		self.cache_db = self._open_cache_db()
+		self.cache = {}  # Entries of the current model/category namespace, loaded by _prepare_category_lookup
+		self._cache_pending = {}  # Cache entries added since the last save_cache()
+		self._cache_lock = threading.Lock()  # Guards cache writes (asyncio loop) against save_cache (sort thread)
+		self._inflight_classifications = {}  # Content hash -> Future of the model request already running for it
+		self._cache_namespace = ""  # Digest of model + categories, prefixed to persistent cache keys
+		self.semantic_cache_threshold = 0.95  # Cosine similarity needed to reuse a similar file's category
+		self._embedder = None  # SentenceTransformer, loaded by _load_embedder before classifying; False if that failed
+		self._embedder_lock = threading.Lock()
+		self._semantic_index = None  # FAISS inner-product index over normalized embeddings
+		self._semantic_categories = []  # Category for each vector in _semantic_index
 		self.language = "en"
 		self.google_drive_service = None
 		self.dropbox_client = None
@@ -153,11 +463,23 @@ class DocumentSorter:
 		self.cancel_requested = False
 		self.is_processing = False
 		self.max_depth = 3  # Default max depth
+		self.max_files = 0  # Max files taken per run (0 = no limit), guards against runaway directories
+		self.classify_concurrency = 4  # Classification requests in flight at the start of a run
+		self.max_classify_concurrency = 8  # Upper bound the adaptive limit may grow to
+		self.classify_batch_size = 16  # Files per batched classification request (1 = one request per file)
+		self._batch_pending = []  # (filename, size, sample, future) waiting for the next batch
+		self._batch_flush_handle = None  # Timer that sends a partial batch
+		self._batch_tasks = set()  # Batch requests in flight (strong references until they finish)
+		self._classify_limit = self.classify_concurrency  # Current adaptive limit
+		self._classify_in_flight = 0
+		self._classify_successes = 0  # Successes since the limit last changed
+		self._classify_cond = None  # asyncio.Condition guarding the counters above (lives on self.loop)
 
 		# Check required libraries
 		self.check_libraries()
 
 		self.setup_ui()
+		self._drain_after_id = self.root.after(100, self._drain_ui)  # Periodic, coalesced log/progress updates
 		logger.info(f"DEBUG: self.ollama_url BEFORE load_config: {self.ollama_url}")
 		self.load_config()
 		logger.info(f"DEBUG: self.ollama_url AFTER load_config: {self.ollama_url}")
@@ -180,7 +502,9 @@ class DocumentSorter:
 
 	def check_libraries(self):
 		"""Checks if optional libraries for file types and cloud are loaded."""
-		if not PyPDF2: logger.warning("PyPDF2 not found. PDF processing disabled. Install with: pip install pypdf2")
+		if not fitz and not pdfminer_extract_text_to_fp and not PyPDF2: logger.warning(
+			"PyMuPDF, pdfminer.six and PyPDF2 not found. PDF processing disabled. Install with: pip install pymupdf")
+		elif not fitz: logger.info("PyMuPDF not found, using slower PDF extractors. Install with: pip install pymupdf")
 		if not docx: logger.warning(
 			"python-docx not found. DOCX processing disabled. Install with: pip install python-docx")
 		if not openpyxl: logger.warning(
@@ -191,6 +515,8 @@ class DocumentSorter:
 		if not service_account: logger.warning(
 			"google-api-python-client and google-auth-oauthlib not found. Google Drive disabled. Install with: pip install google-api-python-client google-auth-oauthlib google-auth-httplib2")
 		if not msal: logger.warning("msal not found. OneDrive integration disabled. Install with: pip install msal")
+		if not SentenceTransformer or not faiss: logger.info(
+			"sentence-transformers/faiss not found. Semantic cache disabled. Install with: pip install sentence-transformers faiss-cpu")
 
 	def run_loop(self):
 		"""Runs the asyncio event loop."""
@@ -201,10 +527,31 @@ class DocumentSorter:
 			self.loop.close()
 			logger.info("Asyncio event loop closed.")
 
+	async def _get_aio_session(self):
+		"""Returns the shared aiohttp session, creating it on first use (must run on self.loop)."""
+		if self._aio_session is None or self._aio_session.closed:
+			# Keep-alive pool shared by all Ollama servers; no single server gets more than its share of
+			# connections. Request concurrency is limited separately
+			connector = aiohttp.TCPConnector(limit=50, limit_per_host=16)
+			self._aio_session = aiohttp.ClientSession(connector=connector)
+		return self._aio_session
+
 	def on_closing(self):
 		"""Handles window closing."""
 		logger.info("Close requested. Stopping asyncio loop and saving cache/config.")
 		self.cancel_sorting(force=True)  # Attempt to cancel if running
+		# Drop pending timers so neither fires into a destroyed interpreter ("invalid command name")
+		for after_id in (self._status_after_id, self._drain_after_id):
+			if after_id is not None:
+				self.root.after_cancel(after_id)
+		self._status_after_id = self._drain_after_id = None
+		if self._aio_session is not None and self.loop.is_running():
+			close_future = asyncio.run_coroutine_threadsafe(self._aio_session.close(), self.loop)
+			try:
+				close_future.result(timeout=2.0)
+			except Exception as e:
+				logger.warning(f"Failed to close aiohttp session cleanly: {e}")
+		self.session.close()
 		if self.loop.is_running():
 			self.loop.call_soon_threadsafe(self.loop.stop)
 		# Give the loop thread time to finish
@@ -212,27 +559,45 @@ class DocumentSorter:
 		if self.loop_thread.is_alive():
 			logger.warning("Asyncio loop thread did not exit cleanly.")
 		self.save_cache()
+		self.cache_db.close()
 		self.save_config()
 		self.root.destroy()
 
+	def _open_cache_db(self):
+		"""Opens (creating if needed) the SQLite classification cache and drops entries that can't be used."""
+		db = sqlite3.connect("sorter_cache.sqlite", check_same_thread=False)
+		db.execute("CREATE TABLE IF NOT EXISTS cache(hash TEXT PRIMARY KEY, category TEXT, ts INTEGER)")
+		with db:
+			# Keys without a "namespace:" prefix predate per-model keys and can never match again;
+			# entries not written for a long time belong to models/category sets no longer in use
+			db.execute("DELETE FROM cache WHERE instr(hash, ':') = 0 OR ts < ?",
+					   (int(time.time()) - CACHE_MAX_AGE,))
+		return db
+
 	def load_cache(self):
-		"""Loads classification cache."""
-		cache_file = "cache.json"
+		"""Loads the classification cache entries of the current model/category namespace."""
+		if not self._cache_namespace: return {}
+		prefix = f"{self._cache_namespace}:"
 		try:
-			if os.path.exists(cache_file):
-				with open(cache_file, 'r', encoding='utf-8') as f:
-					return json.load(f)
-		except (json.JSONDecodeError, IOError) as e:
-			logger.error(f"Error loading cache file {cache_file}: {e}")
-		return {}
+			# Key range instead of LIKE, so SQLite answers from the primary key index
+			return dict(self.cache_db.execute(
+				"SELECT hash, category FROM cache WHERE hash >= ? AND hash < ?", (prefix, prefix[:-1] + ";")))
+		except sqlite3.Error as e:
+			logger.error(f"Error loading cache database: {e}")
+			return {}
 
 	def save_cache(self):
-		"""Saves classification cache."""
+		"""Saves classification cache (only entries added since the last save, in one transaction)."""
+		with self._cache_lock:
+			pending, self._cache_pending = self._cache_pending, {}
+		if not pending: return
 		try:
-			with open("cache.json", 'w', encoding='utf-8') as f:
-				json.dump(self.cache, f, indent=2, ensure_ascii=False)
-		except IOError as e:
-			logger.error(f"Error saving cache file: {e}")
+			now = int(time.time())
+			with self.cache_db:  # Commits once for the whole batch
+				self.cache_db.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+										  [(h, c, now) for h, c in pending.items()])
+		except sqlite3.Error as e:
+			logger.error(f"Error saving cache database: {e}")
 
 	def load_config(self):
 		"""Loads user configuration."""
@@ -244,7 +609,9 @@ class DocumentSorter:
 					self.source_dir_var.set(config.get("source_dir", ""))
 					self.dest_dir_var.set(config.get("dest_dir", ""))
 					self.dedupe_mode.set(config.get("dedupe_mode", "none"))
+					self.backup_mode.set(config.get("backup_mode", "fast"))
 					self.ollama_url = config.get("ollama_url", self.ollama_url)
+					self._update_ollama_urls()
 					logger.info(f"DEBUG: ollama_url after loading config: {self.ollama_url}")
 					# Ensure model from config exists, else reset
 					loaded_model = config.get("model")
@@ -274,6 +641,11 @@ class DocumentSorter:
 
 					self.max_depth_var.set(str(config.get("max_depth", 3)))
 					self.max_depth = int(self.max_depth_var.get())
+					self.max_files = int(config.get("max_files", 0))
+					self.classify_concurrency = max(1, int(config.get("classify_concurrency", 4)))
+					self.max_classify_concurrency = max(self.classify_concurrency,
+														int(config.get("max_classify_concurrency", 8)))
+					self.classify_batch_size = max(1, int(config.get("classify_batch_size", 16)))
 
 		except (json.JSONDecodeError, IOError) as e:
 			logger.error(f"Error loading config file {config_file}: {e}")
@@ -286,9 +658,14 @@ class DocumentSorter:
 			"source_dir": self.source_dir_var.get(),
 			"dest_dir": self.dest_dir_var.get(),
 			"dedupe_mode": self.dedupe_mode.get(),
+			"backup_mode": self.backup_mode.get(),
 			"ollama_url": self.ollama_url,
 			"model": self.model,  # Save selected model
 			"max_depth": self.max_depth,  # Save max depth
+			"max_files": self.max_files,  # 0 = no limit
+			"classify_concurrency": self.classify_concurrency,
+			"max_classify_concurrency": self.max_classify_concurrency,
+			"classify_batch_size": self.classify_batch_size,
 			# Save categories only if manual sorting is enabled
 			"categories": self.category_list if not self.auto_sort_var.get() else []
 		}
@@ -460,6 +837,7 @@ class DocumentSorter:
 
 		# --- Progress Bar ---
 		self.progress_var = tk.DoubleVar()
+		self._progress_shown = None  # New variable, force the next drain to apply the pending value
 		self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
 		self.progress_bar.pack(fill=tk.X, pady=5)
 
@@ -469,6 +847,9 @@ class DocumentSorter:
 		# Right-align buttons
 		self.backup_button = ttk.Button(button_frame, text=_("Create Backup"), command=self.create_backup)
 		self.backup_button.pack(side=tk.LEFT, padx=5)
+		self.backup_mode = tk.StringVar(value="fast")  # fast = zlib level 1, small = level 9
+		ttk.Radiobutton(button_frame, text=_("Fast"), value="fast", variable=self.backup_mode).pack(side=tk.LEFT, padx=5)
+		ttk.Radiobutton(button_frame, text=_("Small"), value="small", variable=self.backup_mode).pack(side=tk.LEFT, padx=5)
 
 		self.cancel_button = ttk.Button(button_frame, text=_("Cancel"), command=self.cancel_sorting, state=tk.DISABLED)
 		self.cancel_button.pack(side=tk.RIGHT, padx=5)
@@ -508,6 +889,8 @@ class DocumentSorter:
 	def change_language(self, lang):
 		"""Changes the application language."""
 		global _
+		if lang == getattr(self, "language", None):
+			return  # Already active, nothing to rebuild
 		logger.info(f"Changing language to: {lang}")
 		self.language = lang
 		_ = setup_localization(lang)
@@ -521,16 +904,19 @@ class DocumentSorter:
 		self.check_ollama_status()
 
 	def set_ollama_url(self):
-		"""Opens a dialog to set the Ollama API URL."""
+		"""Opens a dialog to set the Ollama API URL(s)."""
 		new_url = simpledialog.askstring(
 			_("Ollama Base URL"),  # Changed title
-			_("Enter the BASE URL for the Ollama server (e.g., http://localhost:11434):"),  # Changed prompt
+			_("Enter the BASE URL for the Ollama server (e.g., http://localhost:11434). "
+			  "Separate several servers with commas to spread classification across them:"),  # Changed prompt
 			initialvalue=self.ollama_url
 		)
 		if new_url:
 			# Basic validation
-			if new_url.startswith("http://") or new_url.startswith("https://"):
-				self.ollama_url = new_url.strip('/')  # Remove trailing slash
+			urls = [u.strip() for u in new_url.split(',') if u.strip()]
+			if urls and all(u.startswith(("http://", "https://")) for u in urls):
+				self.ollama_url = ",".join(u.rstrip('/') for u in urls)  # Remove trailing slashes
+				self._update_ollama_urls()
 				logger.info(f"Ollama URL set to: {self.ollama_url}")
 				self.log_message(f"Ollama URL set to: {self.ollama_url}")
 				self.check_ollama_status()  # Check connection with new URL
@@ -667,46 +1053,67 @@ class DocumentSorter:
 
 	# --- Ollama Interaction (Increased Timeouts, Better Error Handling) ---
 	def check_ollama_status(self):
-		"""Checks Ollama API status."""
+		"""Checks Ollama API status in a background thread so the UI never blocks on the network."""
 		if not hasattr(self, 'status_label') or not self.status_label.winfo_exists():
 			return  # UI not ready yet
 
-		url = f"{self.ollama_url.strip('/')}/api/tags"  # Use /api/tags which lists models
+		# A manual check supersedes any pending retry
+		if self._status_after_id is not None:
+			self.root.after_cancel(self._status_after_id)
+			self._status_after_id = None
+
+		url = f"{self.ollama_urls[0]}/api/tags"  # Use /api/tags which lists models
+		threading.Thread(target=self._check_ollama_status_worker, args=(url,), daemon=True).start()
+
+	def _check_ollama_status_worker(self, url):
+		"""Runs the blocking status request and hands the result back to the Tk thread."""
 		try:
-			# Use a short timeout for status check
-			response = requests.get(url, timeout=5)
+			# Use a short timeout for status check (connect, read)
+			response = self.session.get(url, timeout=(3, 5))
 			if response.status_code == 200:
-				self.status_label.config(text=_("Connected"), foreground="green")
+				status = (_("Connected"), "green", True)
 			# Don't fetch models here, let postcommand or refresh button do it
-			# self.fetch_models()
 			else:
-				self.status_label.config(text=_("Error: API Status {status}").format(status=response.status_code),
-										 foreground="red")
+				status = (_("Error: API Status {status}").format(status=response.status_code), "red", False)
 				logger.warning(f"Ollama API check failed: {response.status_code} - {response.text[:100]}")
 		except requests.exceptions.ConnectionError:
-			self.status_label.config(text=_("Disconnected"), foreground="red")
+			status = (_("Disconnected"), "red", False)
 		# logger.warning(_("Cannot connect to Ollama API. Is it running?")) # Less verbose logging
 		except requests.exceptions.Timeout:
-			self.status_label.config(text=_("Timeout"), foreground="orange")
+			status = (_("Timeout"), "orange", False)
 			logger.warning(_("Ollama API check timed out."))
 		except Exception as e:
-			self.status_label.config(text=_("Error"), foreground="red")
+			status = (_("Error"), "red", False)
 			logger.error(f"Error checking Ollama status: {e}", exc_info=False)  # Avoid stack trace for common errors
+		self._call_in_ui(self._apply_ollama_status, *status)
 
-	# # Schedule next check (optional, can be resource intensive)
-	# self.root.after(15000, self.check_ollama_status) # Check every 15s
+	def _apply_ollama_status(self, text, color, connected):
+		"""Shows the status check result; while Ollama is unreachable, retries with exponential backoff."""
+		if not hasattr(self, 'status_label') or not self.status_label.winfo_exists():
+			return  # UI closed or being rebuilt
+		self.status_label.config(text=text, foreground=color)
+
+		if self._status_after_id is not None:
+			self.root.after_cancel(self._status_after_id)
+			self._status_after_id = None
+		if connected:
+			self._status_backoff = 1
+		else:
+			# Retry after 1s, 2s, 4s, ... capped at 60s
+			self._status_after_id = self.root.after(self._status_backoff * 1000, self.check_ollama_status)
+			self._status_backoff = min(self._status_backoff * 2, 60)
 
 	def fetch_models(self):
 		"""Fetches available models from Ollama."""
 		if not hasattr(self, 'model_combobox') or not self.model_combobox.winfo_exists():
 			return  # UI not ready yet
 
-		url = f"{self.ollama_url.strip('/')}/api/tags"
+		url = f"{self.ollama_urls[0]}/api/tags"  # Servers are expected to share the same models
 		logger.info(f"DEBUG: Using Ollama URL base: {self.ollama_url}")  # <-- Add this
 		logger.info(f"Fetching models from {url}...")  # Keep this
 		try:
-			# Slightly longer timeout for fetching models
-			response = requests.get(url, timeout=10)
+			# Slightly longer timeout for fetching models (connect, read)
+			response = self.session.get(url, timeout=(3, 10))
 			if response.status_code == 200:
 				models_data = response.json()
 				self.available_models = sorted([model["name"] for model in models_data.get("models", [])])
@@ -867,27 +1274,65 @@ class DocumentSorter:
 
 	# --- Logging & Reporting ---
 	def log_message(self, message):
-		"""Adds a message to the GUI log."""
+		"""Queues a message for the GUI log (safe to call from any thread)."""
+		timestamp = time.strftime('%H:%M:%S')
+		self._log_queue.put(f"{timestamp} - {message}\n")
+
+	def _set_progress(self, value):
+		"""Requests a progress bar value (safe to call from any thread); applied on the next UI drain."""
+		self._progress_pending = value
+
+	def _on_file_done(self, _future=None):
+		"""Counts one finished file and updates the progress value (safe to call from any thread)."""
+		with self._files_done_lock:
+			self._files_done += 1
+			progress = self._files_done / self._files_total * 100
+		self._set_progress(progress)  # Only stores the value; the UI drain applies it at a fixed rate
+
+	def _call_in_ui(self, func, *args):
+		"""Runs func(*args) on the Tk thread at the next UI drain (safe to call from any thread)."""
+		self._ui_calls.put((func, args))
+
+	def _drain_ui(self):
+		"""Runs queued UI calls, then applies queued log lines and the latest progress value in one redraw
+		(runs on the Tk thread, so worker threads and the asyncio loop never call into Tk themselves)."""
+		try:
+			while True:
+				try:
+					func, args = self._ui_calls.get_nowait()
+				except queue.Empty:
+					break
+				try:
+					func(*args)
+				except Exception as e:
+					logger.error(f"UI callback {getattr(func, '__name__', func)} failed: {e}", exc_info=True)
 
-		# Ensure this runs in the main Tkinter thread
-		def update_log():
-			if not hasattr(self, 'log_text') or not self.log_text.winfo_exists():
-				return  # Avoid errors if UI closed prematurely
+			messages = []
 			try:
-				self.log_text.config(state=tk.NORMAL)
-				timestamp = time.strftime('%H:%M:%S')
-				self.log_text.insert(tk.END, f"{timestamp} - {message}\n")
-				self.log_text.see(tk.END)  # Scroll to the end
-				self.log_text.config(state=tk.DISABLED)
-			except tk.TclError as e:
-				# Can happen if widget is destroyed during update
-				logger.warning(f"GUI log update failed: {e}")
+				while True:
+					messages.append(self._log_queue.get_nowait())
+			except queue.Empty:
+				pass
 
-		if threading.current_thread() is threading.main_thread():
-			update_log()
-		else:
-			# Schedule the update in the main thread
-			self.root.after(0, update_log)
+			if messages and hasattr(self, 'log_text') and self.log_text.winfo_exists():
+				try:
+					self.log_text.config(state=tk.NORMAL)
+					self.log_text.insert(tk.END, "".join(messages))
+					self.log_text.see(tk.END)  # Scroll to the end
+					self.log_text.config(state=tk.DISABLED)
+				except tk.TclError as e:
+					# Can happen if widget is destroyed during update
+					logger.warning(f"GUI log update failed: {e}")
+
+			progress = self._progress_pending
+			# Redraw on a full percent step, or to land exactly on the start/end of a run
+			if progress is not None and progress != self._progress_shown and (
+					self._progress_shown is None or abs(progress - self._progress_shown) >= 1 or progress in (0, 100)):
+				self.progress_var.set(progress)
+				self._progress_shown = progress
+		finally:
+			# Always reschedule: every Tk update goes through here, a stopped loop would freeze the UI
+			self._drain_after_id = self.root.after(100, self._drain_ui)
 
 	def export_log(self):
 		"""Exports the GUI log content."""
@@ -995,37 +1440,59 @@ class DocumentSorter:
 		if backup_path:
 			logger.info(f"Starting backup of '{source_dir}' to '{backup_path}'...")
 			self.log_message(_("Starting backup... This may take a while."))
-			self.progress_var.set(0)  # Use progress bar for backup too
+			self._set_progress(0)  # Use progress bar for backup too
 			self.sort_button.config(state=tk.DISABLED)
 			self.backup_button.config(state=tk.DISABLED)
 
 			# Run backup in a separate thread to keep UI responsive
-			backup_thread = threading.Thread(target=self._execute_backup, args=(source_dir, backup_path), daemon=True)
+			backup_thread = threading.Thread(target=self._execute_backup,
+											 args=(source_dir, backup_path, self.backup_mode.get()), daemon=True)
 			backup_thread.start()
 
-	def _execute_backup(self, source_dir, backup_path):
+	@staticmethod
+	def _walk_files(top, prefix=""):
+		"""Yields (path, archive name) for every file under top; one scandir pass per directory,
+		archive names built from a running prefix instead of relpath per file."""
+		try:
+			with os.scandir(top) as it:
+				entries = list(it)
+		except OSError as e:
+			logger.warning(f"Cannot read directory {top}: {e}")
+			return
+		for entry in entries:
+			if entry.is_dir(follow_symlinks=False):
+				yield from DocumentSorter._walk_files(entry.path, f"{prefix}{entry.name}/")
+			elif entry.is_symlink() and entry.is_dir():
+				continue  # Like os.walk: a link to a directory is neither followed nor stored
+			else:
+				yield entry.path, prefix + entry.name
+
+	def _execute_backup(self, source_dir, backup_path, mode="fast"):
 		"""Actual backup logic running in a thread."""
-		total_files = sum(len(files) for _, _, files in os.walk(source_dir))
+		backup_files = list(self._walk_files(source_dir))  # Single pass; the count comes for free
+		total_files = len(backup_files)
 		files_added = 0
 		try:
-			with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
-				for root, _, files in os.walk(source_dir):
-					for file in files:
-						if self.cancel_requested:  # Check for cancellation
-							raise InterruptedError("Backup cancelled by user.")
-						file_path = os.path.join(root, file)
-						arcname = os.path.relpath(file_path, source_dir)
-						try:
+			compresslevel = 9 if mode == "small" else 1  # Level 1 is several times faster than the default 6
+			with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True,
+								 compresslevel=compresslevel) as zipf:
+				for file_path, arcname in backup_files:
+					if self.cancel_requested:  # Check for cancellation
+						raise InterruptedError("Backup cancelled by user.")
+					try:
+						if os.path.splitext(file_path)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+							zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+						else:
 							zipf.write(file_path, arcname)
-							files_added += 1
-							# Update progress (less frequently to avoid GUI overload)
-							if files_added % 50 == 0 or files_added == total_files:
-								progress = (files_added / total_files) * 100 if total_files > 0 else 100
-								self.root.after(0, self.progress_var.set, progress)
-						except Exception as write_err:
-							logger.warning(f"Could not add file to backup: {file_path} - {write_err}")
-						# Optionally log to GUI as well
-						# self.log_message(_("Warning: Could not back up {file}").format(file=os.path.basename(file_path)))
+						files_added += 1
+						# Update progress (less frequently to avoid GUI overload)
+						if files_added % 50 == 0 or files_added == total_files:
+							progress = (files_added / total_files) * 100 if total_files > 0 else 100
+							self._set_progress(progress)
+					except Exception as write_err:
+						logger.warning(f"Could not add file to backup: {file_path} - {write_err}")
+					# Optionally log to GUI as well
+					# self.log_message(_("Warning: Could not back up {file}").format(file=os.path.basename(file_path)))
 
 			logger.info(_(f"Backup successfully created at {backup_path}"))
 			self.log_message(
@@ -1039,7 +1506,7 @@ class DocumentSorter:
 		except Exception as e:
 			logger.error(f"Backup failed: {e}", exc_info=True)
 			self.log_message(_("Backup failed. See logs for details."))
-			messagebox.showerror(_("Backup Error"), _("Failed to create backup. Check logs."))
+			self._call_in_ui(messagebox.showerror, _("Backup Error"), _("Failed to create backup. Check logs."))
 			# Attempt to remove potentially corrupt zip file
 			if os.path.exists(backup_path):
 				try:
@@ -1049,12 +1516,12 @@ class DocumentSorter:
 		finally:
 			# Reset UI elements in the main thread
 			def reset_ui():
-				self.progress_var.set(0)
+				self._set_progress(0)
 				self.sort_button.config(state=tk.NORMAL)
 				self.backup_button.config(state=tk.NORMAL)
 				self.cancel_requested = False  # Reset cancel flag
 
-			self.root.after(0, reset_ui)
+			self._call_in_ui(reset_ui)
 
 	# --- Sorting Control ---
 	def start_sorting(self):
@@ -1141,7 +1608,7 @@ class DocumentSorter:
 		self.add_subcategory_btn.config(state=tk.DISABLED)
 		self.remove_category_btn.config(state=tk.DISABLED)
 
-		self.progress_var.set(0)
+		self._set_progress(0)
 
 		# Run the main sorting logic in a separate thread
 		thread = threading.Thread(target=self.sort_documents, args=(source_dir, dest_dir), daemon=True)
@@ -1184,7 +1651,7 @@ class DocumentSorter:
 			self.cancel_requested = False
 			self.is_paused = False
 
-			self.progress_var.set(0)  # Reset progress bar
+			self._set_progress(0)  # Reset progress bar
 
 			# Restore button states
 			self.sort_button.config(state=tk.NORMAL)
@@ -1202,17 +1669,59 @@ class DocumentSorter:
 		if threading.current_thread() is threading.main_thread():
 			reset_ui()
 		else:
-			self.root.after(0, reset_ui)
+			self._call_in_ui(reset_ui)  # Worker threads never touch Tk directly
+
+	def _update_ollama_urls(self):
+		"""Parses self.ollama_url (comma-separated base URLs) into the round-robin server list."""
+		self.ollama_urls = [u.strip().rstrip('/') for u in self.ollama_url.split(',') if u.strip()] \
+			or ["http://localhost:11434"]
+		self._rr = itertools.cycle(self.ollama_urls)
+
+	def _next_url(self):
+		"""Returns the next Ollama base URL; classification requests rotate over all servers."""
+		return next(self._rr)
+
+	def _get_file_size(self, file_path):
+		"""Returns the file size, reusing the stat captured during the directory scan when available."""
+		st = self._file_stats.get(file_path)
+		return st.st_size if st is not None else os.path.getsize(file_path)
+
+	def _load_embedder(self):
+		"""Loads (downloading on first use) the semantic cache model once, before classification starts."""
+		if not SentenceTransformer or not faiss: return
+		with self._embedder_lock:
+			if self._embedder is not None: return
+			try:
+				self._embedder = SentenceTransformer("all-MiniLM-L6-v2")
+				self._semantic_index = faiss.IndexFlatIP(self._embedder.get_sentence_embedding_dimension())
+			except Exception as e:
+				logger.warning(f"Semantic cache disabled, embedding model failed to load: {e}")
+				self._embedder = False  # Don't retry (and re-download) on every later sort this session
+
+	def _embed_for_semantic_cache(self, text):
+		"""Returns the normalized embedding of text (runs in executor; needs _load_embedder first)."""
+		return self._embedder.encode([text], normalize_embeddings=True)
 
 	# --- Deduplication (Using multiprocessing helper) ---
 	def get_file_hash(self, file_path):
-		"""Computes MD5 hash for a file (helper)."""
+		"""Computes the cache key hash for a file (helper).
+
+		Files larger than 2 MiB are keyed by size plus their first and last MiB only, so large media
+		isn't read in full. Two large files sharing size, header and footer would share a cache entry;
+		acceptable for a classification cache, which is why deduplication still hashes full contents.
+		"""
 		# This is kept for single file hashing in cache check, dedupe uses the top-level func
 		try:
-			hasher = hashlib.md5()
-			with open(file_path, 'rb') as f:
-				while chunk := f.read(8192):
-					hasher.update(chunk)
+			size = self._get_file_size(file_path)
+			if size <= 2 * HASH_CHUNK_SIZE:
+				return hash_file(file_path)
+			hasher = xxhash.xxh3_64() if xxhash else hashlib.md5()
+			hasher.update(str(size).encode())
+			# Head and tail straight from the page cache via the mapping, no bytes objects
+			with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+					memoryview(mm) as view:
+				hasher.update(view[:HASH_CHUNK_SIZE])
+				hasher.update(view[-HASH_CHUNK_SIZE:])
 			return hasher.hexdigest()
 		except IOError as e:
 			logger.error(f"Error hashing file {file_path}: {e}")
@@ -1232,29 +1741,52 @@ class DocumentSorter:
 		unique_files = []
 
 		# Use multiprocessing Pool
-		# Limit processes to avoid overwhelming older systems, but use more than 1 if possible
-		num_processes = min(max(1, cpu_count() - 1), 4)  # Use N-1 cores, max 4, min 1
+		# Hashing scales with cores; capped so disks on older systems aren't thrashed by too many readers
+		num_processes = min(max(1, cpu_count()), 8)
 		logger.debug(f"Using {num_processes} processes for hashing.")
 
 		file_info_map = {}
 		try:
-			with Pool(processes=num_processes) as pool:
-				# Use imap_unordered for potentially better memory usage and responsiveness
-				results = pool.imap_unordered(process_file_for_deduplication, files_to_check)
-				processed_count = 0
-				for i, result in enumerate(results):
-					processed_count += 1
-					if self.cancel_requested: raise InterruptedError("Deduplication cancelled.")
-					if result and result[1]:  # Check if result is valid
-						file_path, info = result
-						file_info_map[file_path] = info
-					# Update progress occasionally (e.g., every 5%)
-					if i % max(1, len(files_to_check) // 20) == 0:
-						progress = (i + 1) / len(files_to_check) * 100
-						self.root.after(0, self.progress_var.set, progress)
-						self.root.after(0, self.log_message,
-										_("Hashing files for deduplication ({:.0f}%)...").format(progress))
-
+			# Size and mtime come from the scan's stat results, so workers only read file contents
+			file_entries = []
+			size_buckets = {}
+			for path in files_to_check:
+				st = self._file_stats.get(path) or os.stat(path)
+				file_entries.append((path, st.st_size, st.st_mtime))
+				size_buckets[st.st_size] = size_buckets.get(st.st_size, 0) + 1
+			to_hash = []
+			if mode == "hardcore":
+				# Name + size only: the scan's stat results are enough, no file is read
+				for path, size, mod_time in file_entries:
+					file_info_map[path] = {"hash": None, "size": size, "mod_time": mod_time}
+			else:
+				# A file with a unique size can't have an exact duplicate: only same-size files get read
+				for path, size, mod_time in file_entries:
+					if size_buckets[size] > 1:
+						to_hash.append((path, size, mod_time))
+					else:
+						file_info_map[path] = {"hash": None, "size": size, "mod_time": mod_time}
+				logger.debug(f"{len(to_hash)} of {len(file_entries)} files share a size and need hashing.")
+			# Sizes from the scan often leave nothing to hash; don't start worker processes for nothing
+			if to_hash:
+				with Pool(processes=num_processes) as pool:
+					# Use imap_unordered for potentially better memory usage and responsiveness;
+					# about four chunks per worker: little IPC for many small files, yet a handful of
+					# same-size videos still spreads over all workers
+					chunksize = max(1, len(to_hash) // (num_processes * 4))
+					results = pool.imap_unordered(process_file_for_deduplication, to_hash, chunksize=chunksize)
+					processed_count = 0
+					for i, result in enumerate(results):
+						processed_count += 1
+						if self.cancel_requested: raise InterruptedError("Deduplication cancelled.")
+						if result and result[1]:  # Check if result is valid
+							file_path, info = result
+							file_info_map[file_path] = info
+						# Update progress occasionally (e.g., every 5%)
+						if i % max(1, len(to_hash) // 20) == 0:
+							progress = (i + 1) / len(to_hash) * 100
+							self._set_progress(progress)
+							self.log_message(_("Hashing files for deduplication ({:.0f}%)...").format(progress))
 
 		except InterruptedError:
 			logger.warning("Deduplication hashing cancelled.")
@@ -1267,19 +1799,19 @@ class DocumentSorter:
 			return files_to_check, 0
 
 		# Reset progress for removal phase
-		self.root.after(0, self.progress_var.set, 0)
+		self._set_progress(0)
 		logger.info(f"Hashing complete in {time.time() - start_time:.2f}s. Identifying duplicates...")
 
 		# Group files by chosen key
 		groups = {}
-		if mode == "normal":  # Hash-based
+		if mode == "normal":  # Hash-based (size too: unhashed unique-size files have no hash)
 			for path, info in file_info_map.items():
-				key = info["hash"]
+				key = (info["size"], info["hash"])
 				if key not in groups: groups[key] = []
 				groups[key].append(path)
 		elif mode == "hardcore":  # Name + Size based
 			for path, info in file_info_map.items():
-				key = (info["name"], info["size"])
+				key = (os.path.basename(path), info["size"])
 				if key not in groups: groups[key] = []
 				groups[key].append(path)
 
@@ -1314,7 +1846,7 @@ class DocumentSorter:
 					removed_success += 1
 					# Update progress
 					progress = (i + 1) / duplicates_removed_count * 100
-					self.root.after(0, self.progress_var.set, progress)
+					self._set_progress(progress)
 
 				except OSError as e:
 					logger.error(f"Failed to remove duplicate {duplicate_path}: {e}")
@@ -1334,7 +1866,7 @@ class DocumentSorter:
 		end_time = time.time()
 		logger.info(
 			f"Deduplication finished in {end_time - start_time:.2f}s. Removed: {duplicates_removed_count} files.")
-		self.root.after(0, self.progress_var.set, 0)  # Reset progress bar
+		self._set_progress(0)  # Reset progress bar
 
 		return unique_files, duplicates_removed_count
 
@@ -1347,20 +1879,18 @@ class DocumentSorter:
 		# Clear existing manual/previous auto categories
 		self.category_list.clear()
 		# Clear tree in main thread
-		self.root.after(0, lambda: self.category_tree.delete(*self.category_tree.get_children()))
+		self._call_in_ui(lambda: self.category_tree.delete(*self.category_tree.get_children()))
 
 		if not files_sample:
 			logger.warning("No files provided for auto-category generation.")
 			return False  # Indicate failure
 
-		# Prepare file info list (limit sample size for prompt)
+		# Prepare file info as parallel lists (limit sample size for prompt)
 		max_sample = 10  # Limit number of files sent in prompt
-		file_info_list = [
-			{"filename": os.path.basename(f),
-			 "extension": os.path.splitext(f)[1].lower(),
-			 "size_bytes": os.path.getsize(f)}
-			for f in files_sample[:max_sample]
-		]
+		sample = files_sample[:max_sample]
+		filenames = [os.path.basename(f) for f in sample]
+		exts = [os.path.splitext(name)[1].lower() for name in filenames]
+		sizes = [self._get_file_size(f) for f in sample]
 
 		# Improved prompt
 		prompt = f"""Analyze the following file list and propose a hierarchical category structure suitable for organizing them.
@@ -1368,8 +1898,8 @@ Use common sense categories based on file names, extensions, and typical usage.
 Maximum category depth: {self.max_depth}.
 Prioritize broader categories first. Be concise.
 
-File Sample ({len(file_info_list)} files):
-{json.dumps(file_info_list, indent=2)}
+File Sample ({len(filenames)} files, one per line: name extension size_bytes):
+{self._format_file_lines(filenames, exts, sizes)}
 
 Respond ONLY with a JSON object representing the category tree. Example:
 {{
@@ -1386,7 +1916,7 @@ Respond ONLY with a JSON object representing the category tree. Example:
 }}"""
 
 		generated_categories = {}
-		url = f"{self.ollama_url.strip('/')}/api/generate"
+		url = f"{self.ollama_urls[0]}/api/generate"
 		payload = {
 			"model": self.model,
 			"prompt": prompt,
@@ -1397,42 +1927,42 @@ Respond ONLY with a JSON object representing the category tree. Example:
 			}
 		}
 		# Use a longer timeout for generation (can take time)
-		timeout = aiohttp.ClientTimeout(total=300.0)  # 5 minutes total timeout
+		timeout = aiohttp.ClientTimeout(total=300.0, connect=3.0)  # 5 minutes total timeout
 
 		try:
 			logger.debug(f"Sending auto-category prompt to Ollama (model: {self.model})")
-			async with aiohttp.ClientSession(timeout=timeout) as session:
-				async with session.post(url, json=payload) as response:
-					logger.info(f"Ollama auto-category response status: {response.status}")
-					if response.status == 200:
-						data = await response.json()
-						response_text = data.get("response", "").strip()
-						logger.debug(f"Ollama auto-category raw response: {response_text}")
-
-						# Attempt to parse the JSON response
-						try:
-							# Sometimes models add markdown backticks, try removing them
-							if response_text.startswith("```json"): response_text = response_text[7:]
-							if response_text.endswith("```"): response_text = response_text[:-3]
-							response_text = response_text.strip()
+			session = await self._get_aio_session()
+			async with session.post(url, json=payload, timeout=timeout) as response:
+				logger.info(f"Ollama auto-category response status: {response.status}")
+				if response.status == 200:
+					data = await response.json()
+					response_text = data.get("response", "").strip()
+					logger.debug(f"Ollama auto-category raw response: {response_text}")
+
+					# Attempt to parse the JSON response
+					try:
+						# Sometimes models add markdown backticks, try removing them
+						if response_text.startswith("```json"): response_text = response_text[7:]
+						if response_text.endswith("```"): response_text = response_text[:-3]
+						response_text = response_text.strip()
 
-							generated_categories = json.loads(response_text)
-							if not isinstance(generated_categories, dict):
-								logger.warning(
-									f"Ollama returned valid JSON, but not a dictionary: {type(generated_categories)}")
-								generated_categories = {}  # Reset if not dict
-
-						except json.JSONDecodeError as json_err:
-							logger.error(f"Failed to parse Ollama JSON response for auto-categories: {json_err}")
-							logger.error(f"Raw response was: {response_text}")
-							self.log_message(_("Error: Ollama returned invalid format for categories."))
-							return False  # Indicate failure
-					else:
-						error_text = await response.text()
-						logger.error(f"Ollama auto-category request failed: {response.status} - {error_text[:200]}")
-						self.log_message(_("Error: Ollama failed to generate categories (Status: {status})").format(
-							status=response.status))
+						generated_categories = json.loads(response_text)
+						if not isinstance(generated_categories, dict):
+							logger.warning(
+								f"Ollama returned valid JSON, but not a dictionary: {type(generated_categories)}")
+							generated_categories = {}  # Reset if not dict
+
+					except json.JSONDecodeError as json_err:
+						logger.error(f"Failed to parse Ollama JSON response for auto-categories: {json_err}")
+						logger.error(f"Raw response was: {response_text}")
+						self.log_message(_("Error: Ollama returned invalid format for categories."))
 						return False  # Indicate failure
+				else:
+					error_text = await response.text()
+					logger.error(f"Ollama auto-category request failed: {response.status} - {error_text[:200]}")
+					self.log_message(_("Error: Ollama failed to generate categories (Status: {status})").format(
+						status=response.status))
+					return False  # Indicate failure
 
 		except asyncio.TimeoutError:
 			logger.error("Ollama auto-category request timed out.")
@@ -1459,6 +1989,11 @@ Respond ONLY with a JSON object representing the category tree. Example:
 			self.log_message(_("Warning: Ollama did not provide categories."))
 			return False  # Indicate failure
 
+	@staticmethod
+	def _format_file_lines(filenames, exts, sizes):
+		"""Renders parallel file metadata lists as numbered prompt lines in a single join."""
+		return "\n".join(f"{i + 1}. {name} {ext} {size}" for i, (name, ext, size) in enumerate(zip(filenames, exts, sizes)))
+
 	def _build_category_tree_and_list(self, categories_dict, parent_id="", current_path=""):
 		"""Recursively builds treeview and category_list from Ollama's dict."""
 		for name, subcategories in categories_dict.items():
@@ -1487,7 +2022,7 @@ Respond ONLY with a JSON object representing the category tree. Example:
 						item_id = None
 
 				item_id = None
-				self.root.after(0, add_item)
+				self._call_in_ui(add_item)
 			# Give Tkinter a moment to process the insertion - needed? Maybe not.
 			# time.sleep(0.01) # Small delay - AVOID SLEEP IN ASYNC/MAIN THREAD HELPERS
 
@@ -1512,6 +2047,7 @@ Respond ONLY with a JSON object representing the category tree. Example:
 		duplicates_removed_count = 0
 		categories_created = set()  # Track unique category paths used
 		all_files = []
+		self._file_stats = {}
 
 		try:
 			# --- 1. Collect Files ---
@@ -1527,18 +2063,29 @@ Respond ONLY with a JSON object representing the category tree. Example:
 
 			self.log_message(_("Scanning source directory..."))
 			logger.info(f"Scanning source directory: {source_dir}")
-			for entry in os.scandir(source_dir):
-				if entry.is_file(follow_symlinks=False):  # Don't follow symlinks out of source
-					# Basic check for file readability
-					try:
-						# Try opening briefly to catch permission errors early
-						with open(entry.path, 'rb') as f:
-							f.read(1)
-						all_files.append(entry.path)
-					except OSError as e:
-						logger.warning(f"Skipping unreadable file: {entry.path} - {e}")
-						self.log_message(_("Skipping unreadable file: {filename}").format(filename=entry.name))
-				if self.cancel_requested: raise InterruptedError("Scan cancelled.")
+			# Files of any size are taken: classification only uses name, size and a short sample
+			with os.scandir(source_dir) as it:
+				for entry in it:
+					if entry.is_file(follow_symlinks=False):  # Don't follow symlinks out of source
+						# Checked on the next file rather than after the Nth, so the warning means one was skipped
+						if self.max_files and len(all_files) >= self.max_files:
+							logger.warning(f"Reached file limit ({self.max_files}); remaining files are left in place.")
+							self.log_message(_("File limit reached ({count}). Remaining files are left in place.").format(
+								count=self.max_files))
+							break
+						# Basic check for file readability
+						try:
+							# DirEntry caches its stat result; keep it so later stages don't stat again
+							st = entry.stat(follow_symlinks=False)
+							# Catch permission errors early without opening every file
+							if not os.access(entry.path, os.R_OK):
+								raise PermissionError("Permission denied")
+							all_files.append(entry.path)
+							self._file_stats[entry.path] = st
+						except OSError as e:
+							logger.warning(f"Skipping unreadable file: {entry.path} - {e}")
+							self.log_message(_("Skipping unreadable file: {filename}").format(filename=entry.name))
+					if self.cancel_requested: raise InterruptedError("Scan cancelled.")
 
 			if not all_files:
 				logger.warning("No files found in the source directory.")
@@ -1573,10 +2120,10 @@ Respond ONLY with a JSON object representing the category tree. Example:
 					logger.warning("Auto-category generation failed or yielded no categories. Using fallback.")
 					self.log_message(_("Warning: Auto-category generation failed. Using 'Uncategorized'."))
 					# Clear tree in main thread
-					self.root.after(0, lambda: self.category_tree.delete(*self.category_tree.get_children()))
+					self._call_in_ui(lambda: self.category_tree.delete(*self.category_tree.get_children()))
 					self.category_list = ["Uncategorized"]
 					# Add fallback to tree in main thread
-					self.root.after(0, lambda: self.category_tree.insert("", tk.END, text="Uncategorized"))
+					self._call_in_ui(lambda: self.category_tree.insert("", tk.END, text="Uncategorized"))
 			else:
 				# Manual mode: Ensure destination category folders exist
 				self.log_message(_("Using manually defined categories."))
@@ -1599,54 +2146,102 @@ Respond ONLY with a JSON object representing the category tree. Example:
 				self.complete_sorting(_("Error: No categories defined or generated. Cannot sort."))
 				return
 
+			# Precompute lowercase category lookups once instead of per file
+			self._prepare_category_lookup()
+			if SentenceTransformer and faiss and self._embedder is None:
+				# Up front, not inside the first files' classification where everyone would wait on it
+				self.log_message(_("Loading semantic cache model..."))
+				self._load_embedder()
+
 			# --- 4. Process Files (Classification & Move) ---
 			total_files_to_process = len(files_to_process)
 			logger.info(f"Starting classification and moving {total_files_to_process} files...")
 			self.log_message(_("Classifying and moving files..."))
 
-			# Use ThreadPoolExecutor for I/O bound tasks (network classification, file move)
-			num_workers = min(max(1, cpu_count()), 4)  # Limit workers on older systems
-			logger.debug(f"Using {num_workers} worker threads for file processing.")
-
-			with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-				# Submit tasks
-				future_to_file = {executor.submit(self.process_single_file, file_path, dest_dir): file_path for
-								  file_path in files_to_process}
+			# Collect file metadata first, then classify everything concurrently on the asyncio loop;
+			# the adaptive request limit keeps Ollama from being flooded
+			file_infos = []
+			for file_path in files_to_process:
+				try:
+					file_infos.append(self._build_file_info(file_path))
+				except OSError as e:
+					logger.error(f"Cannot get info for file {file_path}: {e}")
+					self.log_message(_("Error getting info for {filename}. Skipping.").format(
+						filename=os.path.basename(file_path)))
+			with self._files_done_lock:
+				self._files_total = total_files_to_process
+				self._files_done = total_files_to_process - len(file_infos)  # Skipped files count as done
+			self._classify_limit = self.classify_concurrency
+			self._classify_successes = 0
+
+			# Three overlapping stages: extraction (hashing + content sampling) in a small disk-bound pool,
+			# classification as asyncio tasks, moves in their own pool so a slow (cross-device) move
+			# doesn't hold up classification
+			move_futures = []
+			self._reserved_dest_paths = set()
+			# Same device: a move is a single atomic rename, no need for shutil's copy fallback logic
+			self._same_fs = os.stat(source_dir).st_dev == os.stat(dest_dir).st_dev
+			results = queue.Queue()  # (file_info, category path or exception), in completion order
+			# Same-device renames are metadata-only and serialize in the filesystem anyway: one mover is enough
+			move_workers = 1 if self._same_fs else 4
+			# Processes only pay off when there are documents to parse; started lazily for that reason
+			if any(info["extension"] in PARSED_SAMPLE_EXTENSIONS for info in file_infos):
+				self._parse_executor = self._new_parse_executor()
+			with concurrent.futures.ThreadPoolExecutor(max_workers=min(4, max(2, cpu_count())),
+													   thread_name_prefix="extract") as extract_executor, \
+					concurrent.futures.ThreadPoolExecutor(max_workers=move_workers,
+														  thread_name_prefix="move") as move_executor:
+				self._extract_executor = extract_executor
+				self._move_executor = move_executor
+				classify_all_future = asyncio.run_coroutine_threadsafe(self._classify_all(file_infos, results),
+																	   self.loop)
+
+				for _i in range(len(file_infos)):
+					item = None
+					while item is None and not self.cancel_requested:
+						try:
+							item = results.get(timeout=0.5)
+						except queue.Empty:
+							pass
+					if item is None:  # Cancelled while waiting
+						logger.info("Cancellation detected, stopping classification...")
+						classify_all_future.cancel()  # Cancels every pending classification on the loop
+						break
 
-				for i, future in enumerate(concurrent.futures.as_completed(future_to_file)):
-					file_path = future_to_file[future]
+					file_info, category_path = item
+					move_future = None
 					try:
-						category_used = future.result()  # Get the category path used (or None if failed)
+						move_future = self._queue_move(file_info, category_path, dest_dir)
+						if move_future is not None:
+							move_futures.append(move_future)
+							# Progress counts finished moves; the callback runs in the move pool
+							move_future.add_done_callback(self._on_file_done)
+					except InterruptedError:
+						logger.info(f"Processing cancelled for {file_info['filename']} and subsequent files.")
+						classify_all_future.cancel()
+						break
+					except Exception as exc:
+						logger.error(f"Error processing file {file_info['filename']}: {exc}", exc_info=True)
+						self.log_message(_("Error processing {filename}. See logs.").format(filename=file_info['filename']))
+					if move_future is None:  # Skipped or failed before the move, still counts as done
+						self._on_file_done()
+
+				# Wait for the moves still in flight; queued moves are dropped on cancellation
+				if self.cancel_requested:
+					move_executor.shutdown(wait=False, cancel_futures=True)
+				for move_future in move_futures:
+					if move_future.cancelled():
+						continue
+					try:
+						category_used = move_future.result()  # Category path used (or None if the move failed)
 						if category_used:
 							processed_files_count += 1
 							categories_created.add(category_used)  # Track unique categories used
-					except InterruptedError:
-						# Caught if cancel_requested was set within process_single_file
-						logger.info(f"Processing cancelled for {os.path.basename(file_path)} and subsequent files.")
-						break  # Stop processing more files
 					except Exception as exc:
-						logger.error(f"Error processing file {os.path.basename(file_path)}: {exc}", exc_info=True)
-						self.log_message(
-							_("Error processing {filename}. See logs.").format(filename=os.path.basename(file_path)))
-
-					# Update progress bar (runs in main thread via root.after)
-					progress = (i + 1) / total_files_to_process * 100
-					self.root.after(0, self.progress_var.set, progress)
-
-					# Check for cancellation between files
-					if self.cancel_requested:
-						logger.info("Cancellation detected, shutting down worker threads...")
-						# Attempt to cancel pending futures (may not work for already running tasks)
-						for f in future_to_file:
-							if not f.done(): f.cancel()
-						executor.shutdown(wait=False, cancel_futures=True)  # Python 3.9+
-						# executor.shutdown(wait=False) # Older Python
-						break
-
-					# Handle pause
-					while self.is_paused:
-						if self.cancel_requested: break  # Allow cancelling while paused
-						time.sleep(0.5)  # Sleep briefly while paused
+						logger.error(f"Error moving file: {exc}", exc_info=True)
+						self.log_message(_("Error moving file. See logs."))
+			self._extract_executor = None
+			self._move_executor = None
 
 			# --- 5. Finalization ---
 			end_time = time.time()
@@ -1670,7 +2265,7 @@ Respond ONLY with a JSON object representing the category tree. Example:
 				"elapsed_time": f"{elapsed_time:.2f} seconds"
 			}
 			# Generate report in main thread
-			self.root.after(0, self.generate_report, stats)
+			self._call_in_ui(self.generate_report, stats)
 
 		# Cloud sync would go here if implemented
 		# if self.google_drive_service or self.dropbox_client or self.onedrive_client:
@@ -1697,51 +2292,69 @@ Respond ONLY with a JSON object representing the category tree. Example:
 			logger.critical(f"Critical error during sorting process: {e}", exc_info=True)
 			self.log_message(_("Critical Error: Sorting failed. Check logs."))
 			# Show error in UI as well
-			self.root.after(0, messagebox.showerror, _("Sorting Error"),
+			self._call_in_ui(messagebox.showerror, _("Sorting Error"),
 							_("An unexpected error occurred: {error}. Check logs.").format(error=e))
 		finally:
+			if self._parse_executor is not None:  # The current pool; ones recycled after a timeout are already down
+				self._parse_executor.shutdown(wait=False, cancel_futures=True)
+				self._parse_executor = None
+			self.save_cache()  # Persist this run's classifications so the next run skips them
 			# Ensure UI is reset regardless of how the process ended
 			self.complete_sorting(final_status)
 
-	def process_single_file(self, file_path, dest_dir):
-		"""Processes one file: classify, create dir, move. Returns category path or None."""
+	def _build_file_info(self, file_path):
+		"""Returns the metadata dict async_classify_file works from (raises OSError if the file is gone)."""
+		filename = os.path.basename(file_path)
+		return {
+			"filename": filename,
+			"extension": os.path.splitext(filename)[1].lower(),
+			"size_bytes": self._get_file_size(file_path),
+			"path": file_path  # Pass full path for content sampling
+		}
+
+	async def _classify_all(self, file_infos, results):
+		"""Classifies all files concurrently on self.loop, putting (file_info, category or exception) on results."""
+		# Bounds the files being sampled/classified at once; HTTP requests are further limited
+		# by the adaptive classification slots
+		semaphore = asyncio.Semaphore(50)
+
+		async def classify_one(file_info):
+			async with semaphore:
+				while self.is_paused and not self.cancel_requested:
+					await asyncio.sleep(0.5)  # Hold new classifications while paused
+				if self.cancel_requested:
+					results.put((file_info, InterruptedError("Cancelled")))
+					return
+				try:
+					# No overall deadline: waiting here and for a request slot is queueing, not a stuck file.
+					# Each stage bounds itself (sampling 10s, batch 45s, single requests 30s per attempt)
+					category_path = await self.async_classify_file(file_info)
+				except Exception as e:  # Includes asyncio.TimeoutError; reported to the consumer
+					category_path = e
+				results.put((file_info, category_path))
+
+		await asyncio.gather(*(classify_one(file_info) for file_info in file_infos))
+
+	def _queue_move(self, file_info, category_path, dest_dir):
+		"""Validates a classification result, reserves a destination and queues the move. Returns the move Future or None."""
 		# Check cancellation flag at the start
-		if self.cancel_requested: raise InterruptedError("Cancelled")
+		if self.cancel_requested or isinstance(category_path, InterruptedError): raise InterruptedError("Cancelled")
 
-		filename = os.path.basename(file_path)
+		filename = file_info["filename"]
+		file_path = file_info["path"]
 		logger.debug(f"Processing: {filename}")
-		# Don't log every file to GUI by default, too verbose
-		# self.log_message(_("Processing: {filename}").format(filename=filename))
-
-		# --- 1. Classify ---
-		# Prepare file info (avoid reading full file here if possible)
-		try:
-			file_info = {
-				"filename": filename,
-				"extension": os.path.splitext(filename)[1].lower(),
-				"size_bytes": os.path.getsize(file_path),
-				"path": file_path  # Pass full path for content sampling
-			}
-		except OSError as e:
-			logger.error(f"Cannot get info for file {file_path}: {e}")
-			self.log_message(_("Error getting info for {filename}. Skipping.").format(filename=filename))
-			return None  # Skip file
 
-		# Use asyncio.run_coroutine_threadsafe to call the async classification
-		classify_future = asyncio.run_coroutine_threadsafe(self.async_classify_file(file_info), self.loop)
-		try:
-			# Add a timeout for classification per file
-			category_path = classify_future.result(timeout=60.0)  # 60s timeout per file classification
-		except asyncio.TimeoutError:
-			logger.warning(f"Classification timed out for {filename}. Using fallback.")
-			self.log_message(_("Timeout classifying {filename}. Using fallback.").format(filename=filename))
-			category_path = self.category_list[0]  # Use first category as fallback
-		except Exception as classify_err:
-			logger.error(f"Classification failed for {filename}: {classify_err}", exc_info=True)
+		if isinstance(category_path, asyncio.TimeoutError):
+			# No answer is not an answer: leave the file for the next run instead of misfiling it
+			logger.warning(f"Classification timed out for {filename}. Leaving it in place.")
+			self.log_message(_("Timeout classifying {filename}. Left in place.").format(filename=filename))
+			return None
+		elif isinstance(category_path, Exception):
+			logger.error(f"Classification failed for {filename}: {category_path}", exc_info=category_path)
 			self.log_message(_("Error classifying {filename}. Using fallback.").format(filename=filename))
 			category_path = self.category_list[0]  # Use first category as fallback
 
-		if not category_path or category_path not in self.category_list:
+		if not category_path or category_path not in self._category_set:
 			logger.warning(
 				f"Invalid or empty category '{category_path}' returned for {filename}. Using fallback '{self.category_list[0]}'.")
 			category_path = self.category_list[0]  # Fallback
@@ -1757,21 +2370,23 @@ Respond ONLY with a JSON object representing the category tree. Example:
 
 			dest_path = os.path.join(final_dest_dir, filename)
 
-			# Handle potential naming conflicts
+			# Handle potential naming conflicts (paths claimed by pending moves count as taken)
 			counter = 1
 			base, ext = os.path.splitext(filename)
-			while os.path.exists(dest_path):
-				# Check if existing file is identical (hash check?) - potentially slow
-				# Simple approach: rename the file being moved
-				logger.warning(f"Destination file exists: {dest_path}. Renaming.")
-				dest_path = os.path.join(final_dest_dir, f"{base}_{counter}{ext}")
-				counter += 1
-				if counter > 100:  # Safety break
-					logger.error(
-						f"Could not find unique name for {filename} in {final_dest_dir} after 100 attempts. Skipping.")
-					self.log_message(
-						_("Error: Too many name conflicts for {filename}. Skipping.").format(filename=filename))
-					return None  # Skip file
+			with self._dest_lock:
+				while os.path.exists(dest_path) or dest_path in self._reserved_dest_paths:
+					# Check if existing file is identical (hash check?) - potentially slow
+					# Simple approach: rename the file being moved
+					logger.warning(f"Destination file exists: {dest_path}. Renaming.")
+					dest_path = os.path.join(final_dest_dir, f"{base}_{counter}{ext}")
+					counter += 1
+					if counter > 100:  # Safety break
+						logger.error(
+							f"Could not find unique name for {filename} in {final_dest_dir} after 100 attempts. Skipping.")
+						self.log_message(
+							_("Error: Too many name conflicts for {filename}. Skipping.").format(filename=filename))
+						return None  # Skip file
+				self._reserved_dest_paths.add(dest_path)
 
 		except OSError as e:
 			logger.error(f"Error preparing destination for {filename} (category: {category_path}): {e}")
@@ -1783,7 +2398,24 @@ Respond ONLY with a JSON object representing the category tree. Example:
 		if self.cancel_requested: raise InterruptedError("Cancelled")
 
 		try:
-			shutil.move(file_path, dest_path)
+			# Hand the move to the move pool so the next classification result can be handled right away
+			return self._move_executor.submit(self._move_file, file_path, dest_path, category_path)
+		except RuntimeError:  # Move pool already shut down because sorting was cancelled
+			raise InterruptedError("Cancelled")
+
+	def _move_file(self, file_path, dest_path, category_path):
+		"""Moves one classified file into place (runs in the move pool). Returns category path or None."""
+		filename = os.path.basename(file_path)
+		try:
+			if self._same_fs:
+				try:
+					os.replace(file_path, dest_path)  # dest_path is reserved, so nothing gets overwritten
+				except OSError as e:
+					# A category folder can still sit on another mount inside the destination
+					if e.errno != errno.EXDEV: raise
+					shutil.move(file_path, dest_path)
+			else:
+				shutil.move(file_path, dest_path)
 			logger.info(f"Moved '{filename}' -> '{category_path}'")
 			# Maybe log moves less frequently to GUI?
 			# if processed_files_count % 10 == 0: # Example: Log every 10 moves
@@ -1809,204 +2441,438 @@ Respond ONLY with a JSON object representing the category tree. Example:
 		file_path = file_info["path"]
 		filename = file_info["filename"]
 
+		# --- 0. Extension Shortcut ---
+		# Skip hashing, content sampling and the LLM round-trip when the extension alone decides
+		# (file_info["extension"] is already lowercased by the caller)
+		category_path = self._extension_categories.get(file_info["extension"])
+		if category_path:
+			logger.debug(f"Using extension shortcut '{category_path}' for '{filename}'")
+			return category_path
+
 		# --- 1. Check Cache ---
-		file_hash = self.get_file_hash(file_path)  # Hash check still useful
-		if file_hash and file_hash in self.cache:
-			cached_category = self.cache[file_hash]
+		# Hashing reads the file, so keep it off the event loop
+		file_hash = await asyncio.get_running_loop().run_in_executor(self._extract_executor, self.get_file_hash,
+																	 file_path)
+		cache_key = self._cache_key(file_hash)
+		if cache_key and cache_key in self.cache:
+			cached_category = self.cache[cache_key]
 			# Verify cached category still exists in current list
-			if cached_category in self.category_list:
+			if cached_category in self._category_set:
 				logger.debug(f"Using cached category '{cached_category}' for '{filename}'")
+				with self._cache_lock:
+					self._cache_pending[cache_key] = cached_category  # Refreshes ts, so entries in use aren't pruned
 				# self.log_message(_("Using cache for {filename}").format(filename=filename)) # Too verbose for GUI
 				return cached_category
 			else:
 				logger.debug(f"Cached category '{cached_category}' for '{filename}' no longer valid. Re-classifying.")
 			# Remove invalid entry from cache?
-			# del self.cache[file_hash]
+			# del self.cache[cache_key]
+
+		# --- 2. Ask the Model, Once per Content ---
+		# Identical files classified concurrently would all miss the cache; let them share one request
+		if not file_hash:
+			return await self._classify_with_model(file_info, file_hash)
+		pending = self._inflight_classifications.get(file_hash)
+		if pending is not None:
+			logger.debug(f"Waiting for the classification of identical content for '{filename}'")
+			category = await asyncio.shield(pending)  # A timed-out waiter must not cancel the shared request
+			if isinstance(category, asyncio.TimeoutError): raise category  # Identical content, same outcome
+			return category
+		pending = asyncio.get_running_loop().create_future()
+		self._inflight_classifications[file_hash] = pending
+		category = None
+		try:
+			category = await self._classify_with_model(file_info, file_hash)
+			return category
+		except asyncio.TimeoutError as e:
+			category = e  # Handed to the waiters as a value, so an unawaited future logs nothing
+			raise
+		finally:
+			del self._inflight_classifications[file_hash]
+			pending.set_result(category)
+
+	async def _classify_with_model(self, file_info, file_hash):
+		"""Classifies a file that missed the caches: content sample, semantic cache, then Ollama."""
+		file_path = file_info["path"]
+		filename = file_info["filename"]
 
 		# --- 2. Prepare Prompt ---
 		content_sample = await self.get_content_sample(file_path, file_info["extension"])
 
-		# Simplified prompt, relying more on file info + short sample
-		prompt = f"""Classify the following file into ONE category from the list provided.
-Respond with ONLY the category name.
-
-Categories: {', '.join(self.category_list)}
-
-File Information:
-- Name: {filename}
-- Extension: {file_info['extension']}
-- Size: {file_info['size_bytes']} bytes
-
-Content Sample (up to 500 chars):
-{content_sample[:500]}
+		# Semantic cache: a near-identical file (another draft/version) was already classified
+		semantic_vec = None
+		if self._embedder:  # Loaded by sort_documents; never loaded here inside a file's work
+			try:
+				semantic_vec = await asyncio.get_running_loop().run_in_executor(
+					None, self._embed_for_semantic_cache, f"{filename}\n{content_sample[:256]}")
+				if self._semantic_index.ntotal:
+					scores, ids = self._semantic_index.search(semantic_vec, 1)
+					similar_category = self._semantic_categories[ids[0][0]]
+					if scores[0][0] >= self.semantic_cache_threshold and similar_category in self._category_set:
+						logger.debug(f"Using category '{similar_category}' of a similar file for '{filename}'")
+						self._store_cached_category(file_hash, similar_category)
+						return similar_category
+			except Exception as e:
+				logger.warning(f"Semantic cache lookup failed for {filename}: {e}")
+				semantic_vec = None
 
-Category:"""  # Let the model complete this
+		# Fixed instructions go into the system prompt so Ollama can reuse the cached prefix;
+		# only the per-file part changes between requests
+		system = self._get_classification_system_prompt()
+		# Kept short on purpose: prefill cost grows with prompt length (the extension is part of the name)
+		prompt = f"File: {filename} ({file_info['size_bytes']} bytes)\nContent: {content_sample[:500]}\nCategory:"
 
 		# --- 3. Call Ollama ---
-		url = f"{self.ollama_url.strip('/')}/api/generate"
-		payload = {
-			"model": self.model,
-			"prompt": prompt,
-			"stream": False,
-			# "format": "json", # Not requesting JSON here, just raw string category
-			"options": {
-				"num_predict": 32,  # Limit prediction length, category names are short
-				"temperature": 0.2  # Lower temperature for more deterministic category choice
-			}
-		}
-		# Use a moderate timeout for classification
-		timeout = aiohttp.ClientTimeout(total=30.0)  # 30s total timeout
-
+		# Batched first: one request classifies several files, amortizing Ollama's per-request overhead
 		category = None
-		try:
-			async with aiohttp.ClientSession(timeout=timeout) as session:
-				async with session.post(url, json=payload) as response:
-					if response.status == 200:
-						data = await response.json()
-						raw_category = data.get("response", "").strip()
-						# Clean up potential model verbosity ("Category: X" -> "X")
-						if ":" in raw_category: raw_category = raw_category.split(":")[-1].strip()
-						# Remove potential quotes
-						raw_category = raw_category.strip('"`\'')
-
-						logger.debug(f"Ollama classification for '{filename}': '{raw_category}'")
-
-						# Find the best match in our list (case-insensitive partial match?)
-						# Stricter matching is safer: exact match or find if response is a sub-path
-						found_match = None
-						if raw_category in self.category_list:
-							found_match = raw_category
-						else:
-							# Check if Ollama returned a sub-path like "Work/Reports" when only "Work" exists
-							# Or if it returned "Report" instead of "Reports"
-							# Simple approach: find first category name containing the response (or vice versa) - risky
-							# Safer: Use exact match from list. If model hallucinates, use fallback.
-							logger.warning(
-								f"Ollama returned category '{raw_category}' not in list {self.category_list} for file '{filename}'.")
-							found_match = None  # Force fallback later
+		if self.classify_batch_size > 1:
+			category = await self._classify_via_batch(filename, file_info["size_bytes"], content_sample)
+
+		# Single request: batching is off, or the batch gave no usable answer for this file
+		if category is None:
+			payload = {
+				"model": self.model,
+				# Identical system message on every call, so the server can reuse its prefix cache
+				"messages": [
+					{"role": "system", "content": system},
+					{"role": "user", "content": prompt}
+				],
+				"stream": True,  # Stream tokens so reading can stop as soon as the answer is known
+				"keep_alive": "10m",  # Keep the model (and its prompt cache) resident between files
+				# "format": "json", # Not requesting JSON here, just raw string category
+				"options": {
+					"num_predict": 16,  # Category paths are a few tokens; cap decoding accordingly
+					"temperature": 0.1,  # Low temperature for a deterministic category choice
+					"top_p": 0.9,
+					"stop": ["\n"]  # The answer is a single line, stop generating right after it
+				}
+			}
+			# Use a moderate timeout for classification
+			timeout = aiohttp.ClientTimeout(total=30.0, connect=3.0)  # 30s total timeout
+			body = json_dumps_bytes(payload)  # Encoded once, reused by the retry
+
+			timed_out = False
+			for attempt in range(2):  # Retry once (at the reduced concurrency) after a timeout or garbled reply
+				url = f"{self._next_url()}/api/chat"  # Round-robin so several servers work in parallel
+				await self._acquire_classify_slot()
+				overloaded = timed_out = False
+				try:
+					session = await self._get_aio_session()
+					async with session.post(url, data=body, headers=JSON_HEADERS, timeout=timeout) as response:
+						if response.status == 200:
+							response_text = ""
+							async for line in response.content:  # One JSON object per line
+								if not line.strip(): continue
+								chunk = json_loads(line)
+								response_text += chunk.get("message", {}).get("content", "")
+								if chunk.get("done") or "\n" in response_text:
+									break
+								# Stop reading (and generating) once the answer can only be one category
+								if self._clean_category_response(response_text).lower() in self._unambiguous_categories:
+									break
+							raw_category = self._clean_category_response(response_text)
+
+							logger.debug(f"Ollama classification for '{filename}': '{raw_category}'")
+
+							# Find the first (longest) whole category name in the answer, case-insensitively
+							found_match = None
+							match = self._category_regex.search(raw_category) if self._category_regex else None
+							if match:
+								found_match = self._category_lookup.get(match.group(1).lower())
+							if not found_match:
+								# If the model hallucinates a category, use fallback.
+								logger.warning(
+									f"Ollama returned category '{raw_category}' not in list {self.category_list} for file '{filename}'.")
+								found_match = None  # Force fallback later
 
-						category = found_match
+							category = found_match
 
-					else:
-						error_text = await response.text()
-						logger.error(
-							f"Ollama classification request failed for {filename}: {response.status} - {error_text[:200]}")
-					# Fall through to return None (will trigger fallback)
+						else:
+							error_text = await response.text()
+							logger.error(
+								f"Ollama classification request failed for {filename}: {response.status} - {error_text[:200]}")
+							overloaded = response.status >= 500
+						# Fall through to return None (will trigger fallback)
+
+				except asyncio.TimeoutError:
+					logger.warning(f"Ollama classification request timed out for {filename}.")
+					overloaded = timed_out = True
+				except (json.JSONDecodeError, ValueError) as parse_err:
+					logger.warning(f"Malformed Ollama response while classifying {filename}: {parse_err}")
+					overloaded = True
+				except aiohttp.ClientError as client_err:
+					logger.error(f"Network error during Ollama classification for {filename}: {client_err}")
+				# Fall through
+				except Exception as e:
+					logger.error(f"Unexpected error during Ollama classification for {filename}: {e}", exc_info=True)
+				# Fall through
+				finally:
+					await self._release_classify_slot(success=not overloaded)
 
-		except asyncio.TimeoutError:
-			logger.warning(f"Ollama classification request timed out for {filename}.")
-		# Fall through
-		except aiohttp.ClientError as client_err:
-			logger.error(f"Network error during Ollama classification for {filename}: {client_err}")
-		# Fall through
-		except Exception as e:
-			logger.error(f"Unexpected error during Ollama classification for {filename}: {e}", exc_info=True)
-		# Fall through
+				if not overloaded:
+					break
+			if timed_out:  # Both attempts ran out of time; the caller leaves the file where it is
+				raise asyncio.TimeoutError(f"Classification of {filename} timed out")
 
 		# --- 4. Update Cache and Return ---
+		if category and semantic_vec is not None:
+			self._semantic_index.add(semantic_vec)
+			self._semantic_categories.append(category)
 		if category and file_hash:
-			self.cache[file_hash] = category
-			# Save cache periodically? Or on completion? Saving every time is slow.
-			# Consider a separate thread or async task for saving cache less often.
-			# For now, let's save on completion in `on_closing` and `complete_sorting`.
-			# self.save_cache() # Avoid saving here
+			self._store_cached_category(file_hash, category)
 			return category
 		else:
 			# Return None to indicate classification failed or returned invalid category
-			# The calling function (process_single_file) will handle the fallback.
+			# The caller (_queue_move) will handle the fallback.
 			return None
 
+	def _cache_key(self, file_hash):
+		"""Persistent cache key: the same content may get a different answer from another model or category set."""
+		return f"{self._cache_namespace}:{file_hash}" if file_hash else None
+
+	def _store_cached_category(self, file_hash, category):
+		"""Records a classification in the cache (thread-safe against save_cache)."""
+		if not file_hash: return
+		with self._cache_lock:
+			cache_key = self._cache_key(file_hash)
+			self.cache[cache_key] = category
+			self._cache_pending[cache_key] = category  # Written to the database at the end of the run
+			# Saving every time is slow; sort_documents saves once when the run ends
+
+	async def _acquire_classify_slot(self):
+		"""Waits until fewer classification requests are in flight than the current adaptive limit."""
+		if self._classify_cond is None:
+			self._classify_cond = asyncio.Condition()  # Created lazily so it belongs to self.loop
+		async with self._classify_cond:
+			await self._classify_cond.wait_for(lambda: self._classify_in_flight < self._classify_limit)
+			self._classify_in_flight += 1
+
+	async def _release_classify_slot(self, success):
+		"""Frees a request slot and adapts the limit: halve on overload, double after a run of successes."""
+		async with self._classify_cond:
+			self._classify_in_flight -= 1
+			if success:
+				self._classify_successes += 1
+				if self._classify_successes >= 8 and self._classify_limit < self.max_classify_concurrency:
+					self._classify_limit = min(self._classify_limit * 2, self.max_classify_concurrency)
+					self._classify_successes = 0
+					logger.debug(f"Raised classification concurrency to {self._classify_limit}")
+			else:
+				self._classify_limit = max(1, self._classify_limit // 2)
+				self._classify_successes = 0
+				logger.info(f"Ollama looks overloaded, lowered classification concurrency to {self._classify_limit}")
+			self._classify_cond.notify_all()
+
+	def _prepare_category_lookup(self):
+		"""Builds the lowercase category lookups used while classifying (once per category list)."""
+		namespace = hashlib.sha1(
+			"\n".join([self.model, *sorted(self.category_list)]).encode("utf-8")).hexdigest()[:16]
+		if namespace != self._cache_namespace:
+			self._cache_namespace = namespace
+			self.save_cache()  # Unsaved entries belong to the old namespace
+			self.cache = self.load_cache()
+		key = tuple(self.category_list)
+		if key == self._category_lookup_key:
+			return  # Same categories as the previous run, tables are still valid
+		self._category_lookup_key = key
+		self._category_set = frozenset(self.category_list)
+		self._category_lookup = {c.lower(): c for c in self.category_list}
+		# Fixed instructions, built once here instead of per request
+		categories = f"Categories: {' | '.join(self.category_list)}\n"
+		self._cached_system = (categories + "Answer with ONE category name only.",
+							   categories + "Respond with a JSON object mapping each file name to its category.")
+		# Dotted extension -> category path, only where the extension alone decides in this category set
+		self._extension_categories = extension_shortcuts(self.category_list)
+		# A category that prefixes another one ("Work" vs "Work/Reports") may still grow while streaming
+		self._unambiguous_categories = frozenset(
+			c for c in self._category_lookup
+			if not any(other != c and other.startswith(c) for other in self._category_lookup))
+		# Single pass over the answer; longest first so "Work/Reports" wins over "Work", and
+		# lookarounds instead of \b so names ending in punctuation ("C++") still match
+		alternation = "|".join(re.escape(c) for c in sorted(self.category_list, key=len, reverse=True))
+		self._category_regex = re.compile(rf"(?<!\w)({alternation})(?!\w)", re.IGNORECASE) \
+			if self.category_list else None
+
+	@staticmethod
+	def _clean_category_response(text):
+		"""Strips model verbosity ("Category: X" -> "X") and quotes from a classification answer."""
+		text = text.strip()
+		if ":" in text: text = text.split(":")[-1].strip()
+		return text.strip('"`\'')
+
+	async def _classify_via_batch(self, filename, size_bytes, content_sample):
+		"""Queues one file for the next batched classification request. Returns its category or None."""
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self._batch_pending.append((filename, size_bytes, content_sample, future))
+		if len(self._batch_pending) >= self.classify_batch_size:
+			self._flush_classify_batch()
+		elif self._batch_flush_handle is None:
+			# Don't hold a partial batch back for long when files arrive slowly
+			self._batch_flush_handle = loop.call_later(0.05, self._flush_classify_batch)
+		return await future
+
+	def _flush_classify_batch(self):
+		"""Sends the files queued so far as one batch (runs on self.loop)."""
+		if self._batch_flush_handle is not None:
+			self._batch_flush_handle.cancel()
+			self._batch_flush_handle = None
+		batch, self._batch_pending = self._batch_pending, []
+		if batch:
+			# The loop only keeps weak references to tasks; hold it until it finishes
+			task = asyncio.ensure_future(self._send_classify_batch(batch))
+			self._batch_tasks.add(task)
+			task.add_done_callback(self._batch_tasks.discard)
+
+	async def _send_classify_batch(self, batch):
+		"""Classifies a batch with one Ollama request; files without a valid answer resolve to None."""
+		results = {}
+		try:
+			if len(batch) > 1:  # A lone file is better served by the streaming single-file request
+				lines = "\n".join(f"{name} ({size} bytes): {' '.join(sample[:200].split())}"
+								  for name, size, sample, _future in batch)
+				payload = {
+					"model": self.model,
+					"messages": [
+						{"role": "system", "content": self._get_classification_system_prompt(batch=True)},
+						{"role": "user", "content": f"Files:\n{lines}"}
+					],
+					"stream": False,
+					"format": "json",
+					"keep_alive": "10m",
+					"options": {
+						"num_predict": 32 * len(batch),  # Room for one "name": "category" pair per file
+						"temperature": 0.1,
+						"top_p": 0.9
+					}
+				}
+				timeout = aiohttp.ClientTimeout(total=45.0, connect=3.0)
+				await self._acquire_classify_slot()
+				overloaded = False
+				try:
+					session = await self._get_aio_session()
+					async with session.post(f"{self._next_url()}/api/chat", data=json_dumps_bytes(payload),
+											headers=JSON_HEADERS, timeout=timeout) as response:
+						if response.status == 200:
+							content = json_loads(await response.read()).get("message", {}).get("content", "")
+							try:
+								mapping = json_loads(content)
+							except json.JSONDecodeError:
+								# Model wrapped the object in prose; pull out the JSON block
+								match = re.search(r"\{.*\}", content, re.DOTALL)
+								try:
+									mapping = json_loads(match.group(0)) if match else None
+								except json.JSONDecodeError:
+									mapping = None
+							if not isinstance(mapping, dict):
+								# No usable JSON (model ignored the format): read one "name: category" per line
+								mapping = self._parse_batch_lines(content, [name for name, _s, _c, _f in batch])
+							results = mapping
+						else:
+							logger.error(f"Ollama batch classification failed: {response.status}")
+							overloaded = response.status >= 500
+				except asyncio.TimeoutError:
+					logger.warning(f"Ollama batch classification of {len(batch)} files timed out.")
+					overloaded = True
+				except Exception as e:
+					logger.warning(f"Ollama batch classification failed: {e}")
+				finally:
+					await self._release_classify_slot(success=not overloaded)
+		finally:
+			# Resolve every waiting file even if the request was cancelled or failed before it was sent
+			for name, _size, _sample, future in batch:
+				category = None
+				raw_category = results.get(name)
+				if isinstance(raw_category, str) and self._category_regex:
+					match = self._category_regex.search(raw_category)
+					if match:
+						category = self._category_lookup.get(match.group(1).lower())
+				if not future.done():  # The waiting classification may have been cancelled
+					future.set_result(category)
+
+	@staticmethod
+	def _parse_batch_lines(content, filenames):
+		"""Maps each file name to the rest of the first answer line naming it (category matched later).
+
+		A name only counts as a whole token (line start, whitespace, quotes or brackets around it), so
+		"report.txt" doesn't match inside "final_report.txt"; longest names claim their line first and a
+		line answers for one file only.
+		"""
+		lines = content.splitlines()
+		used = set()
+		mapping = {}
+		for name in sorted(set(filenames), key=len, reverse=True):
+			pattern = re.compile(rf"(?<![^\s\"'`(\[|,]){re.escape(name)}(?![\w.\-])")
+			for i, line in enumerate(lines):
+				if i in used: continue
+				match = pattern.search(line)
+				if match:
+					mapping[name] = line[match.end():]
+					used.add(i)
+					break
+		return mapping
+
+	def _get_classification_system_prompt(self, batch=False):
+		"""Returns the classification system prompt built by _prepare_category_lookup for this run's categories."""
+		return self._cached_system[1 if batch else 0]
+
+	@staticmethod
+	def _new_parse_executor():
+		"""Returns a process pool for parsing document samples."""
+		return concurrent.futures.ProcessPoolExecutor(max_workers=min(4, max(2, cpu_count())))
+
+	def _recycle_parse_executor(self, executor):
+		"""Replaces a parse pool whose worker is stuck in a parser, killing its processes (asyncio loop only)."""
+		if self._parse_executor is not executor: return  # Another timeout already replaced it
+		self._parse_executor = self._new_parse_executor()
+		# A timed-out future can't be cancelled once running: the only way to free its worker is to kill it
+		for process in list((executor._processes or {}).values()):
+			process.kill()
+		executor.shutdown(wait=False, cancel_futures=True)
+
 	async def get_content_sample(self, file_path, extension):
 		"""Async helper to get a small content sample from different file types."""
 		# Keep sampling limited to avoid performance hits
 		sample_size_kb = 10
 		max_chars = 500  # Max chars to return
 
+		# Document parsers are pure Python and would serialize on the GIL: parse those in the process pool,
+		# plain reads stay in the extraction threads
+		executor = self._extract_executor
+		if self._parse_executor is not None and extension.lower() in PARSED_SAMPLE_EXTENSIONS:
+			executor = self._parse_executor
 		try:
 			loop = asyncio.get_running_loop()
-			# Run blocking I/O and parsing in a default executor
-			return await loop.run_in_executor(None, self._read_content_sample_sync, file_path, extension,
-											  sample_size_kb * 1024, max_chars)
+			# A pathological file (e.g. a huge scanned PDF) only costs its sample, classification goes on
+			# from the name and size
+			return await asyncio.wait_for(
+				loop.run_in_executor(executor, read_content_sample, file_path, extension, sample_size_kb * 1024,
+									 max_chars),
+				timeout=10.0)
+		except concurrent.futures.BrokenExecutor as e:
+			if executor is self._extract_executor:
+				logger.warning(f"Failed to get content sample for {os.path.basename(file_path)}: {e}")
+				return ""
+			if executor is not self._parse_executor:
+				# Killed along with a stuck neighbour when its pool was recycled; retry in the current pool
+				return await self.get_content_sample(file_path, extension)
+			# A parser crashed a worker and took the pool down; sample the remaining files in threads
+			logger.warning("Content sampling process pool broke, falling back to threads.")
+			self._parse_executor = None
+			executor.shutdown(wait=False, cancel_futures=True)
+			return ""
+		except asyncio.TimeoutError:
+			if executor is not self._extract_executor and executor is not self._parse_executor:
+				# Was queued behind a stuck parser whose pool has been recycled since; retry in the current pool
+				return await self.get_content_sample(file_path, extension)
+			logger.warning(f"Content sampling timed out for {os.path.basename(file_path)}, classifying without it.")
+			if executor is self._parse_executor:
+				self._recycle_parse_executor(executor)
+			return ""
 		except Exception as e:
 			logger.warning(f"Failed to get content sample for {os.path.basename(file_path)}: {e}")
 			return ""  # Return empty string on error
 
-	def _read_content_sample_sync(self, file_path, extension, max_bytes, max_chars):
-		"""Synchronous part of reading content samples (runs in executor)."""
-		content_sample = ""
-		try:
-			ext = extension.lower()
-			if ext == '.pdf' and PyPDF2:
-				try:
-					with open(file_path, 'rb') as f:
-						reader = PyPDF2.PdfReader(f)
-						num_pages = len(reader.pages)
-						text = ""
-						for i in range(min(num_pages, 2)):  # Sample first 2 pages
-							page = reader.pages[i]
-							page_text = page.extract_text()
-							if page_text:
-								text += page_text + "\n"
-								if len(text) >= max_chars: break
-						content_sample = text[:max_chars]
-				except Exception as pdf_err:
-					logger.debug(f"PyPDF2 failed for {os.path.basename(file_path)}: {pdf_err}")
-					# Fallback to binary read
-					with open(file_path, 'rb') as f:
-						content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
-
-			elif ext == '.docx' and docx:
-				try:
-					doc = docx.Document(file_path)
-					text = ""
-					for para in doc.paragraphs[:10]:  # Sample first 10 paragraphs
-						text += para.text + "\n"
-						if len(text) >= max_chars: break
-					content_sample = text[:max_chars]
-				except Exception as docx_err:
-					logger.debug(f"python-docx failed for {os.path.basename(file_path)}: {docx_err}")
-					with open(file_path, 'rb') as f:
-						content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
-
-			elif ext == '.xlsx' and openpyxl:
-				try:
-					wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)  # Read only faster
-					sheet = wb.active
-					text = ""
-					cell_count = 0
-					for row in sheet.iter_rows(max_row=20, max_col=10):  # Sample 20x10 cells
-						for cell in row:
-							if cell.value is not None:
-								text += str(cell.value) + " "
-								cell_count += 1
-								if len(text) >= max_chars or cell_count > 50: break  # Limit cells too
-						if len(text) >= max_chars or cell_count > 50: break
-					content_sample = text[:max_chars]
-					wb.close()  # Close workbook
-				except Exception as xlsx_err:
-					logger.debug(f"openpyxl failed for {os.path.basename(file_path)}: {xlsx_err}")
-					with open(file_path, 'rb') as f:
-						content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
-
-			elif ext == '.odt' and odf_teletype:
-				try:
-					text = odf_teletype.extractText(file_path)
-					content_sample = text[:max_chars]
-				except Exception as odt_err:
-					logger.debug(f"odfpy failed for {os.path.basename(file_path)}: {odt_err}")
-					with open(file_path, 'rb') as f:
-						content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
-
-			else:  # General text or binary fallback
-				with open(file_path, 'rb') as f:
-					content_sample = f.read(max_bytes).decode('utf-8', errors='ignore')[:max_chars]
-
-		except Exception as e:
-			logger.warning(f"Error reading sample from {os.path.basename(file_path)}: {e}")
-			return ""  # Return empty on error
-
-		return content_sample.strip()
-
 # --- Cloud Sync (Placeholder/Example) ---
 # async def sync_to_cloud(self, local_dest_dir):
 #     """Placeholder for async cloud synchronization."""
@@ -2036,8 +2902,9 @@ def main():
 	parser.add_argument("--categories", help="Comma-separated categories for manual mode (overrides config)")
 	parser.add_argument("--dedupe", choices=["none", "normal", "hardcore"],
 						help="Duplicate removal mode (overrides config)")
-	parser.add_argument("--ollama-url", help="URL for Ollama API (overrides config)")
+	parser.add_argument("--ollama-url", help="URL for Ollama API, comma-separated for several servers (overrides config)")
 	parser.add_argument("--model", help="Ollama model to use (overrides config)")
+	parser.add_argument("--max-files", type=int, help="Maximum number of files to sort per run, 0 = no limit (overrides config)")
 	parser.add_argument("--lang", choices=["en", "ru"], default="en", help="Interface language (en or ru)")
 	parser.add_argument("--no-gui", action="store_true", help="Run in command-line mode (requires source and dest)")
 	parser.add_argument('--debug', action='store_true', help='Enable debug logging')
@@ -2073,11 +2940,19 @@ def main():
 
 		# Apply overrides from args to the app instance after init
 		app = DocumentSorter(root, ollama_url=args.ollama_url or "http://localhost:11434")  # Pass URL override
+		app.language = args.lang  # UI was built with this language; lets change_language skip no-op switches
 
 		# Override config values if provided in args AFTER load_config is called internally
+		if args.ollama_url:
+			# load_config replaced the constructor's value with the saved one; the argument wins
+			app.ollama_url = ",".join(u.strip().rstrip('/') for u in args.ollama_url.split(',') if u.strip())
+			app._update_ollama_urls()
+			logger.info(f"Overriding ollama_url from command line arg: {app.ollama_url}")
+			app.check_ollama_status()
 		if args.source: app.source_dir_var.set(args.source)
 		if args.dest: app.dest_dir_var.set(args.dest)
 		if args.dedupe: app.dedupe_mode.set(args.dedupe)
+		if args.max_files is not None: app.max_files = max(0, args.max_files)
 		if args.model:
 			# Check if model exists after fetching
 			if args.model in app.available_models:
@@ -2094,18 +2969,6 @@ def main():
 			app._rebuild_category_tree_from_list()  # Update tree
 			app.toggle_auto_sort()  # Update button states
 
-		# Check this block carefully:
-		if args.ollama_url:  # Check if the argument was provided *at all*
-			logger.info(f"DEBUG: Overriding ollama_url from command line arg: {args.ollama_url}")
-			# Ensure the override uses the *correct* base URL format
-			# It should already be correct if the arg parsing uses the base URL,
-			# but let's be explicit or add validation if needed.
-			# The value passed to the constructor should handle the override initially.
-			# This block might be redundant if the constructor handles it.
-			# Let's comment it out for now to test, as the constructor already takes the arg override:
-			# app.ollama_url = args.ollama_url.strip('/') # TEMPORARILY COMMENT OUT
-			pass  # Let constructor handle the initial override
-
 		app.save_config()  # Save potentially overridden config
 
 		root.mainloop()
@@ -2139,6 +3002,7 @@ def main():
 		model = args.model or config.get("model", "qwen2.5:7b")  # Use a default
 		dedupe_mode_cli = args.dedupe or config.get("dedupe_mode", "none")
 		max_depth_cli = int(config.get("max_depth", 3))  # Get from config or default
+		max_files_cli = args.max_files if args.max_files is not None else int(config.get("max_files", 0))
 		is_auto_cli = True
 		categories_cli = []
 		if args.categories:
@@ -2153,6 +3017,7 @@ def main():
 			def __init__(self, ollama_url_cli, model_cli, categories_list, is_auto_mode, max_depth_val,
 						 dedupe_cli_mode):
 				self.ollama_url = ollama_url_cli
+				self._update_ollama_urls()
 				self.model = model_cli
 				self.category_list = categories_list
 				self.auto_sort_var = tk.BooleanVar(value=is_auto_mode)  # Need BooleanVar for logic? Maybe just bool.
@@ -2161,13 +3026,50 @@ def main():
 				self.dedupe_mode = tk.StringVar(value=dedupe_cli_mode)  # Need StringVar? Maybe just string.
 				self.dedupe_mode_str = dedupe_cli_mode
 
-				self.cache = self.load_cache()
+				self._category_lookup = {}
+				self._category_lookup_key = None
+				self._category_set = frozenset()
+				self._extension_categories = {}
+				self._unambiguous_categories = frozenset()
+				self._category_regex = None
+				self.classify_concurrency = 4
+				self.max_classify_concurrency = 8
+				self.classify_batch_size = 16
+				self._batch_pending = []
+				self._batch_flush_handle = None
+				self._batch_tasks = set()
+				self._classify_limit = self.classify_concurrency
+				self._classify_in_flight = 0
+				self._classify_successes = 0
+				self._classify_cond = None
+				self._aio_session = None
+				self._cached_system = None
+				self._file_stats = {}
+				self._extract_executor = None
+				self._parse_executor = None
+				self._same_fs = False
+				self._files_done = 0
+				self._files_total = 0
+				self._files_done_lock = threading.Lock()
+				self._progress_shown = None
+				self.cache_db = self._open_cache_db()
+				self.cache = {}
+				self._cache_pending = {}
+				self._cache_lock = threading.Lock()
+				self._inflight_classifications = {}
+				self._cache_namespace = ""
+				self.semantic_cache_threshold = 0.95
+				self._embedder = None
+				self._embedder_lock = threading.Lock()
+				self._semantic_index = None
+				self._semantic_categories = []
 				self.cancel_requested = False  # Basic cancellation via Ctrl+C?
 				self.is_paused = False  # Pause not really applicable in CLI
 
-				# Async loop setup needed for async functions
+				# Async loop in its own thread, as in the GUI: sort_documents blocks on it from worker threads
 				self.loop = asyncio.new_event_loop()
-				asyncio.set_event_loop(self.loop)
+				self.loop_thread = threading.Thread(target=self.run_loop, daemon=True)
+				self.loop_thread.start()
 
 				# Need dummy UI vars/methods used by shared functions?
 				# Mock log_message, progress updates
@@ -2177,8 +3079,17 @@ def main():
 			def log_message(self, message):
 				print(f"{time.strftime('%H:%M:%S')} - {message}")  # Print to console
 
+			def _set_progress(self, value):
+				self.progress_var_set(value)
+
+			def _call_in_ui(self, func, *args):
+				pass  # No widgets in CLI mode
+
 			def progress_var_set(self, value):
-				# Simple console progress bar
+				# Simple console progress bar, reprinted only when the shown tenth of a percent changes
+				shown = round(value, 1)
+				if shown == self._progress_shown: return
+				self._progress_shown = shown
 				bar_length = 30
 				filled_length = int(bar_length * value / 100)
 				bar = '#' * filled_length + '-' * (bar_length - filled_length)
@@ -2187,20 +3098,41 @@ def main():
 
 			# --- Include necessary methods from DocumentSorter ---
 			# (Copy/paste or inherit - copy/paste simpler for CLI adaptation)
+			_open_cache_db = DocumentSorter._open_cache_db
 			load_cache = DocumentSorter.load_cache
 			save_cache = DocumentSorter.save_cache
 			get_file_hash = DocumentSorter.get_file_hash
+			_load_embedder = DocumentSorter._load_embedder
+			_embed_for_semantic_cache = DocumentSorter._embed_for_semantic_cache
+			_get_file_size = DocumentSorter._get_file_size
+			_update_ollama_urls = DocumentSorter._update_ollama_urls
+			_next_url = DocumentSorter._next_url
+			_get_aio_session = DocumentSorter._get_aio_session
+			run_loop = DocumentSorter.run_loop
 			# find_and_remove_duplicates needs Pool, process_file_for_deduplication
 			find_and_remove_duplicates = DocumentSorter.find_and_remove_duplicates
+			_move_file = DocumentSorter._move_file
+			_on_file_done = DocumentSorter._on_file_done
 			# async_generate_auto_categories needs aiohttp, _build_category_tree_and_list (adapted)
 			async_generate_auto_categories = DocumentSorter.async_generate_auto_categories
+			_format_file_lines = DocumentSorter._format_file_lines
 			_build_category_tree_and_list = DocumentSorter._build_category_tree_and_list  # Needs adaptation for no Treeview
 			# sort_documents needs ThreadPoolExecutor, process_single_file, generate_report (adapted)
 			sort_documents = DocumentSorter.sort_documents  # Needs heavy adaptation
-			process_single_file = DocumentSorter.process_single_file  # Needs adaptation
 			async_classify_file = DocumentSorter.async_classify_file  # Needs adaptation (source_dir_var)
+			_classify_with_model = DocumentSorter._classify_with_model
+			_store_cached_category = DocumentSorter._store_cached_category
+			_cache_key = DocumentSorter._cache_key
+			_get_classification_system_prompt = DocumentSorter._get_classification_system_prompt
+			_prepare_category_lookup = DocumentSorter._prepare_category_lookup
+			_acquire_classify_slot = DocumentSorter._acquire_classify_slot
+			_classify_via_batch = DocumentSorter._classify_via_batch
+			_flush_classify_batch = DocumentSorter._flush_classify_batch
+			_send_classify_batch = DocumentSorter._send_classify_batch
+			_parse_batch_lines = DocumentSorter._parse_batch_lines
+			_release_classify_slot = DocumentSorter._release_classify_slot
+			_clean_category_response = DocumentSorter._clean_category_response
 			get_content_sample = DocumentSorter.get_content_sample
-			_read_content_sample_sync = DocumentSorter._read_content_sample_sync
 			generate_report = DocumentSorter.generate_report  # Needs adaptation (no UI context)
 
 			# Need simplified _build_category_tree_and_list for CLI
@@ -2254,12 +3186,15 @@ def main():
 				logger.debug(f"Processing: {filename}")
 				try:
 					file_info = {"filename": filename, "extension": os.path.splitext(filename)[1].lower(),
-								 "size_bytes": os.path.getsize(file_path), "path": file_path}
+								 "size_bytes": self._get_file_size(file_path), "path": file_path}
 				except OSError as e:
 					return None  # Skip
 				classify_future = asyncio.run_coroutine_threadsafe(self.async_classify_file(file_info), self.loop)
 				try:
-					category_path = classify_future.result(timeout=60.0)
+					category_path = classify_future.result()  # Requests carry their own timeouts
+				except asyncio.TimeoutError:
+					logger.warning(f"Classification timed out for {filename}. Leaving it in place.")
+					return None  # Skip
 				except Exception:
 					category_path = self.category_list[0]  # Fallback
 				if not category_path or category_path not in self.category_list: category_path = self.category_list[0]
@@ -2277,13 +3212,7 @@ def main():
 				except OSError as e:
 					return None  # Skip
 				if self.cancel_requested: raise InterruptedError("Cancelled")
-				try:
-					shutil.move(file_path, dest_path)
-					logger.info(f"Moved '{filename}' -> '{category_path}'")
-					return category_path  # Return category used
-				except Exception as move_err:
-					logger.error(f"Failed to move {filename}: {move_err}")
-					return None  # Indicate failure
+				return self._move_file(file_path, dest_path, category_path)  # Rename when on the same device
 
 			def sort_documents(self, source_dir_arg, dest_dir_arg):
 				# Adapted version of sort_documents for CLI
@@ -2294,14 +3223,22 @@ def main():
 				all_files = []
 				try:
 					self.log_message(_("Scanning source directory..."))
-					for entry in os.scandir(source_dir_arg):
-						if entry.is_file(follow_symlinks=False):
-							try:
-								with open(entry.path, 'rb') as f:
-									f.read(1)
-							except OSError:
-								logger.warning(f"Skipping unreadable file: {entry.path}")
-						if self.cancel_requested: raise InterruptedError("Scan cancelled.")
+					with os.scandir(source_dir_arg) as it:
+						for entry in it:
+							if entry.is_file(follow_symlinks=False):
+								if self.max_files and len(all_files) >= self.max_files:  # Another file is skipped
+									self.log_message(_("File limit reached ({count}). Remaining files are left in place.").format(
+										count=self.max_files))
+									break
+								try:
+									st = entry.stat(follow_symlinks=False)
+									if not os.access(entry.path, os.R_OK):
+										raise PermissionError("Permission denied")
+									all_files.append(entry.path)
+									self._file_stats[entry.path] = st
+								except OSError:
+									logger.warning(f"Skipping unreadable file: {entry.path}")
+							if self.cancel_requested: raise InterruptedError("Scan cancelled.")
 					if not all_files: self.log_message(_("No files found.")); return
 
 					self.log_message(_("Found {count} files.").format(count=len(all_files)))
@@ -2327,14 +3264,23 @@ def main():
 							except OSError as e:
 								logger.error(f"Could not create dir: {category_path} - {e}")
 					if not self.category_list: self.log_message(_("Error: No categories. Cannot sort.")); return
+					self._prepare_category_lookup()
+					self._load_embedder()
+					self._same_fs = os.stat(source_dir_arg).st_dev == os.stat(dest_dir_arg).st_dev
 
 					total_files_to_process = len(files_to_process)
 					self.log_message(_("Classifying and moving files..."))
 					num_workers = min(max(1, cpu_count()), 4)
 					with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+						with self._files_done_lock:
+							self._files_total = total_files_to_process
+							self._files_done = 0
 						future_to_file = {executor.submit(self.process_single_file, file_path, dest_dir_arg): file_path
 										  for file_path in files_to_process}
-						for i, future in enumerate(concurrent.futures.as_completed(future_to_file)):
+						for future in future_to_file:
+							future.add_done_callback(self._on_file_done)  # Progress from the locked counter
+						# Results in submission order; no as_completed wait-set to maintain
+						for future in future_to_file:
 							try:
 								category_used = future.result();
 							except InterruptedError:
@@ -2343,7 +3289,6 @@ def main():
 								logger.error(f"Error processing {future_to_file[future]}: {exc}")
 							else:
 								if category_used: processed_files_count += 1; categories_created.add(category_used)
-							self.progress_var_set((i + 1) / total_files_to_process * 100)  # Use console progress
 							if self.cancel_requested: break
 					end_time = time.time();
 					elapsed_time = end_time - start_time
@@ -2358,11 +3303,11 @@ def main():
 				except Exception as e:
 					logger.critical(f"Critical error during sorting: {e}", exc_info=True)
 				finally:
-					self.save_cache()  # Save cache at the end
-					self.loop.call_soon_threadsafe(self.loop.stop)  # Stop the loop
+					self.save_cache()  # Save cache at the end; main() stops the loop after closing the session
 
 		# Create and run the headless sorter
 		cli_sorter = HeadlessSorter(ollama_url, model, categories_cli, is_auto_cli, max_depth_cli, dedupe_mode_cli)
+		cli_sorter.max_files = max(0, max_files_cli)
 
 		# Handle Ctrl+C for cancellation
 		import signal
@@ -2372,21 +3317,22 @@ def main():
 
 		signal.signal(signal.SIGINT, signal_handler)
 
-		# Run the sorting in the main thread (or could launch loop thread)
+		# Run the sorting in the main thread; classification runs on the loop thread started by HeadlessSorter
 		try:
-			# Run sort_documents which uses the internal loop via run_coroutine_threadsafe
 			cli_sorter.sort_documents(source_dir, dest_dir)
-			# Keep loop running until sort_documents stops it? Or run forever and let sort_documents handle exit?
-			# If sort_documents is blocking, this might not be needed. If it uses threads internally, loop needs running.
-			# Since sort_documents uses run_coroutine_threadsafe, the loop needs to be running.
-			cli_sorter.loop.run_forever()  # Run until loop.stop() is called in sort_documents.finally
 		except Exception as cli_run_err:
 			logger.critical(f"CLI run failed: {cli_run_err}", exc_info=True)
 		finally:
+			if cli_sorter._aio_session is not None and cli_sorter.loop.is_running():
+				# Release the pooled keep-alive connections instead of leaving them to the GC
+				close_future = asyncio.run_coroutine_threadsafe(cli_sorter._aio_session.close(), cli_sorter.loop)
+				try:
+					close_future.result(timeout=2.0)
+				except Exception as e:
+					logger.warning(f"Failed to close aiohttp session cleanly: {e}")
 			if cli_sorter.loop.is_running():
 				cli_sorter.loop.call_soon_threadsafe(cli_sorter.loop.stop)
-			# Ensure loop closes cleanly
-			# Need to manage the loop thread if started separately. Here it runs in main thread.
+			cli_sorter.loop_thread.join(timeout=2.0)  # run_loop closes the loop once it stops
 			logger.info("CLI execution finished.")
 
 
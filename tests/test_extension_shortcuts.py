@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # main.py is a script, not a package
+# main.py pulls in the GUI and HTTP stack at import time; skip where that isn't installed
+main = pytest.importorskip("main")
+
+
+def test_flat_categories_take_the_shortcut():
+	shortcuts = main.extension_shortcuts(["Images", "Music", "Documents"])
+	assert shortcuts[".jpg"] == "Images"
+	assert shortcuts[".mp3"] == "Music"
+	assert ".pdf" not in shortcuts  # Documents still go to the model
+
+
+def test_category_with_subcategories_goes_to_the_model():
+	shortcuts = main.extension_shortcuts(["Images", "Images/Photos", "Images/Screenshots", "Music"])
+	assert ".jpg" not in shortcuts
+	assert ".png" not in shortcuts
+	assert shortcuts[".mp3"] == "Music"
+
+
+def test_deeper_tree_and_case_are_respected():
+	shortcuts = main.extension_shortcuts(["Media", "Media/Images", "Media/Images/Raw", "videos"])
+	assert ".jpg" not in shortcuts  # "Images" itself is not a category here
+	assert shortcuts[".mp4"] == "videos"